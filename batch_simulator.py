@@ -0,0 +1,308 @@
+import sys
+
+import numpy as np
+
+from blackjack_simulatorV7 import (ACE_RANK, CARD_VALUES, DOUBLE, HIT, RANK_POINTS, SPLIT, STAND, SURRENDER_HIT,
+                                   SURRENDER_STAND, BettingSystem, CardCounter, StrategyManager, print_summary)
+
+
+def _decision_cells(table, deviations):
+    """ (lignes, rangs du croupier, 5) : action de base, seuil haut, action haute, seuil bas, action basse """
+    cells = np.empty((len(table), len(CARD_VALUES), 5))
+    cells[:, :, 0] = table
+    cells[:, :, 1:] = (np.inf, STAND, -np.inf, STAND)
+    for row, row_deviations in enumerate(deviations):
+        for dealer_rank, deviation in enumerate(row_deviations or ()):
+            if deviation is not None:
+                cells[row, dealer_rank, 1:] = deviation
+    return cells
+
+
+class BatchSimulator:
+    """ Joue num_shoes sabots indépendants en parallèle avec des tableaux NumPy (une main par sabot et par tour)
+
+    Les règles sont celles de BlackjackSimulator. Les mains de chaque sabot sont enchaînées les unes après les
+    autres pour calculer l'argent final, le plus haut et le plus bas, comme un seul joueur. """
+
+    def __init__(self, count_values_file, betting_file, ace_strategy_file, pair_strategy_file, hard_strategy_file,
+                 num_decks=6, penetration=0.6, base_bet=10, initial_money=100, num_games=100, num_shoes=4096,
+                 seed=None, deviation_file=None):
+        self.num_decks = num_decks
+        self.penetration = penetration
+        self.base_bet = base_bet
+        self.initial_money = initial_money
+        self.num_games = num_games
+        self.num_shoes = num_shoes
+        self.rng = np.random.default_rng(seed)
+
+        strategy_manager = StrategyManager(pair_strategy_file, ace_strategy_file, hard_strategy_file,
+                                           deviation_file)
+        self.pair_cells = _decision_cells(strategy_manager.pair_table, strategy_manager.pair_deviations)
+        self.soft_cells = _decision_cells(strategy_manager.soft_table, strategy_manager.soft_deviations)
+        self.hard_cells = _decision_cells(strategy_manager.hard_table, strategy_manager.hard_deviations)
+
+        card_counter = CardCounter(count_values_file)
+        self.tags = np.array(card_counter.tags, dtype=float)  # tags fractionnaires acceptés
+
+        # Mise par true count tronqué, 10 par défaut comme BettingSystem.get_bet
+        betting_strategy = BettingSystem(betting_file).betting_strategy
+        self.bet_offset = min(betting_strategy)
+        self.bet_table = np.full(max(betting_strategy) - self.bet_offset + 1, 10.0)
+        for true_count, bet in betting_strategy.items():
+            self.bet_table[true_count - self.bet_offset] = bet
+
+        # Points hors As : l'As est suivi à part pour retrouver les clés de stratégie
+        self.points = np.array([0 if rank == ACE_RANK else points for rank, points in enumerate(RANK_POINTS)],
+                               dtype=np.int16)
+        self.max_hands = 4 * num_decks  # un split demande deux cartes de même valeur
+        self.total_cards = num_decks * 52
+        self._base_shoe = np.repeat(np.arange(len(CARD_VALUES), dtype=np.int8), 4 * num_decks)
+
+        self.shoes = np.empty((num_shoes, self.total_cards), dtype=np.int8)
+        self.positions = np.zeros(num_shoes, dtype=np.int64)
+        self.running_counts = np.zeros(num_shoes)
+        self.true_counts = np.zeros(num_shoes)
+        self._shuffle(np.arange(num_shoes))
+
+        self.money = np.zeros(num_shoes)
+        self.highest_money = np.full(num_shoes, -np.inf)
+        self.lowest_money = np.full(num_shoes, np.inf)
+        self.counts = dict.fromkeys(('Player', 'Dealer', 'Surrender', 'Push', 'Split'), 0)
+        self.rounds = 0
+        self.net_squares = 0.0
+
+    def _shuffle(self, shoes):
+        self.shoes[shoes] = self.rng.permuted(np.broadcast_to(self._base_shoe, (len(shoes), self.total_cards)), axis=1)
+        self.positions[shoes] = 0
+        # Nouveau sabot : le comptage repart de zéro
+        self.running_counts[shoes] = 0
+        self.true_counts[shoes] = 0
+
+    def _draw(self, shoes):
+        exhausted = shoes[self.positions[shoes] >= self.total_cards]
+        if exhausted.size:
+            self._shuffle(exhausted)
+        cards = self.shoes[shoes, self.positions[shoes]]
+        self.positions[shoes] += 1
+        self.running_counts[shoes] += self.tags[cards]
+        num_decks_remaining = np.maximum(self.total_cards - self.positions[shoes], 1) / 52
+        self.true_counts[shoes] = self.running_counts[shoes] / num_decks_remaining
+        return cards
+
+    def _get_bets(self, true_counts):
+        index = np.trunc(true_counts).astype(np.int64) - self.bet_offset
+        valid = (index >= 0) & (index < len(self.bet_table))
+        return np.where(valid, self.bet_table[np.clip(index, 0, len(self.bet_table) - 1)], 10.0)
+
+    def _record_money(self, shoes):
+        money = self.money[shoes]
+        self.highest_money[shoes] = np.maximum(self.highest_money[shoes], money)
+        self.lowest_money[shoes] = np.minimum(self.lowest_money[shoes], money)
+
+    @staticmethod
+    def _hand_value(other, aces):
+        value = other + aces
+        return np.where((aces > 0) & (value + 10 <= 21), value + 10, value)
+
+    def simulate(self):
+        rounds = np.full(self.num_shoes, self.num_games // self.num_shoes)
+        rounds[:self.num_games % self.num_shoes] += 1
+        for round_index in range(int(rounds.max(initial=0))):
+            shoes = np.flatnonzero(rounds > round_index)
+            start_money = self.money[shoes]
+            self.play_round(shoes)
+            net = self.money[shoes] - start_money
+            self.rounds += len(shoes)
+            self.net_squares += float(net @ net)
+            shoes = np.flatnonzero(self.total_cards - self.positions < self.total_cards * self.penetration)
+            if shoes.size:
+                self._shuffle(shoes)
+
+        self.display_stats()
+
+    def play_round(self, shoes):
+        n = len(shoes)
+        local = np.arange(n)
+        bets = self._get_bets(self.true_counts[shoes])
+        self.money[shoes] -= bets
+
+        first_card = self._draw(shoes)
+        upcard = self._draw(shoes)
+        second_card = self._draw(shoes)
+        hole_card = self._draw(shoes)
+
+        # Remélange en cours de main, comme play_game
+        reshuffled = shoes[self.total_cards - self.positions[shoes] < self.total_cards * (1 - self.penetration)]
+        if reshuffled.size:
+            self._shuffle(reshuffled)
+
+        blackjack = (((first_card == ACE_RANK) & (self.points[second_card] == 10)) |
+                     ((second_card == ACE_RANK) & (self.points[first_card] == 10)))
+        if blackjack.any():
+            winners = shoes[blackjack]
+            self.money[winners] += bets[blackjack] * 2.5
+            self._record_money(winners)
+            self.counts['Player'] += len(winners)
+
+        live = local[~blackjack]
+        if not live.size:
+            return
+        # Sans peek, un abandon perd toute la mise contre un blackjack du croupier (HouseRules.surrender_lost)
+        dealer_blackjack = (((upcard == ACE_RANK) & (self.points[hole_card] == 10)) |
+                            ((hole_card == ACE_RANK) & (self.points[upcard] == 10)))
+
+        shape = (n, self.max_hands)
+        other = np.zeros(shape, dtype=np.int16)
+        aces = np.zeros(shape, dtype=np.int16)
+        num_cards = np.zeros(shape, dtype=np.int8)
+        first_ranks = np.zeros(shape, dtype=np.int8)
+        second_ranks = np.zeros(shape, dtype=np.int8)
+        hand_bets = np.zeros(shape)
+        first_decision = np.zeros(shape, dtype=bool)
+        num_hands = np.zeros(n, dtype=np.int64)
+        current = np.zeros(n, dtype=np.int64)
+
+        def receive(rows, slots, cards):
+            first_ranks[rows, slots] = np.where(num_cards[rows, slots] == 0, cards, first_ranks[rows, slots])
+            second_ranks[rows, slots] = np.where(num_cards[rows, slots] == 1, cards, second_ranks[rows, slots])
+            other[rows, slots] += self.points[cards]
+            aces[rows, slots] += cards == ACE_RANK
+            num_cards[rows, slots] += 1
+
+        zeros = np.zeros(len(live), dtype=np.int64)
+        receive(live, zeros, first_card[live])
+        receive(live, zeros, second_card[live])
+        hand_bets[live, 0] = bets[live]
+        first_decision[live, 0] = True
+        num_hands[live] = 1
+
+        while True:
+            rows = live[current[live] < num_hands[live]]
+            if not rows.size:
+                break
+            slots = current[rows]
+
+            # Une main issue d'un split reçoit sa deuxième carte avant de jouer
+            waiting = num_cards[rows, slots] == 1
+            if waiting.any():
+                receive(rows[waiting], slots[waiting], self._draw(shoes[rows[waiting]]))
+
+            hand_other = other[rows, slots]
+            is_pair = (num_cards[rows, slots] == 2) & (first_ranks[rows, slots] == second_ranks[rows, slots])
+            dealer_rank = upcard[rows]
+            cells = np.where(
+                is_pair[:, None], self.pair_cells[first_ranks[rows, slots], dealer_rank],
+                np.where(((aces[rows, slots] > 0) & (hand_other <= 10))[:, None],
+                         self.soft_cells[np.minimum(hand_other, 10), dealer_rank],
+                         self.hard_cells[np.minimum(hand_other, len(self.hard_cells) - 1), dealer_rank]))
+            # Index plays : seuils infinis quand la case n'a pas de déviation
+            true_counts = self.true_counts[shoes[rows]]
+            actions = np.where(true_counts >= cells[:, 1], cells[:, 2],
+                               np.where(true_counts < cells[:, 3], cells[:, 4], cells[:, 0])).astype(np.int8)
+
+            later = ~first_decision[rows, slots]
+            actions = np.where(later & ((actions == SURRENDER_HIT) | (actions == DOUBLE)), HIT, actions)
+            actions = np.where(later & (actions == SURRENDER_STAND), STAND, actions)
+            actions = np.where((actions == SPLIT) & ~is_pair, HIT, actions)
+
+            hit = actions == HIT
+            if hit.any():
+                hit_rows, hit_slots = rows[hit], slots[hit]
+                receive(hit_rows, hit_slots, self._draw(shoes[hit_rows]))
+                first_decision[hit_rows, hit_slots] = False
+                busted = self._hand_value(other[hit_rows, hit_slots], aces[hit_rows, hit_slots]) > 21
+                current[hit_rows[busted]] += 1
+
+            double = actions == DOUBLE
+            if double.any():
+                double_rows, double_slots = rows[double], slots[double]
+                self.money[shoes[double_rows]] -= hand_bets[double_rows, double_slots]
+                hand_bets[double_rows, double_slots] *= 2
+                receive(double_rows, double_slots, self._draw(shoes[double_rows]))
+
+            surrender = (actions == SURRENDER_HIT) | (actions == SURRENDER_STAND)
+            if surrender.any():
+                surrender_rows, surrender_slots = rows[surrender], slots[surrender]
+                self.money[shoes[surrender_rows]] += np.where(dealer_blackjack[surrender_rows], 0,
+                                                              hand_bets[surrender_rows, surrender_slots] // 2)
+                hand_bets[surrender_rows, surrender_slots] = 0
+
+            split = actions == SPLIT
+            if split.any():
+                split_rows, split_slots = rows[split], slots[split]
+                self._record_money(shoes[split_rows])
+                self.counts['Split'] += len(split_rows)
+                self.money[shoes[split_rows]] -= hand_bets[split_rows, split_slots]
+                new_slots = num_hands[split_rows]
+                num_hands[split_rows] += 1
+                hand_bets[split_rows, new_slots] = hand_bets[split_rows, split_slots]
+                first_decision[split_rows, new_slots] = True
+                kept_ranks = first_ranks[split_rows, split_slots]
+                moved_ranks = second_ranks[split_rows, split_slots]
+                for slot_indices, rank in ((split_slots, kept_ranks), (new_slots, moved_ranks)):
+                    other[split_rows, slot_indices] = self.points[rank]
+                    aces[split_rows, slot_indices] = rank == ACE_RANK
+                    num_cards[split_rows, slot_indices] = 1
+                    first_ranks[split_rows, slot_indices] = rank
+
+            current[rows[(actions == STAND) | double | surrender]] += 1
+
+        dealer_other = self.points[upcard] + self.points[hole_card]
+        dealer_aces = (upcard == ACE_RANK).astype(np.int16) + (hole_card == ACE_RANK)
+        while True:
+            hitting = live[self._hand_value(dealer_other[live], dealer_aces[live]) < 17]
+            if not hitting.size:
+                break
+            cards = self._draw(shoes[hitting])
+            dealer_other[hitting] += self.points[cards]
+            dealer_aces[hitting] += cards == ACE_RANK
+        dealer_value = self._hand_value(dealer_other, dealer_aces)
+
+        for slot in range(int(num_hands.max())):
+            rows = live[num_hands[live] > slot]
+            player_value = self._hand_value(other[rows, slot], aces[rows, slot])
+            dealer = dealer_value[rows]
+            bet = hand_bets[rows, slot]
+            forfeited = (bet == 0) & dealer_blackjack[rows]
+            surrendered = (bet == 0) & ~forfeited
+            busted = ~surrendered & ~forfeited & (player_value > 21)
+            wins = ~surrendered & ~forfeited & ~busted & ((dealer > 21) | (player_value > dealer))
+            losses = busted | forfeited | (~surrendered & ~wins & (player_value < dealer))
+            pushes = ~surrendered & ~wins & ~losses
+            self.money[shoes[rows]] += np.where(wins, bet * 2, np.where(pushes, bet, 0))
+            self._record_money(shoes[rows])
+            self.counts['Player'] += int(np.count_nonzero(wins))
+            self.counts['Dealer'] += int(np.count_nonzero(losses))
+            self.counts['Surrender'] += int(np.count_nonzero(surrendered))
+            self.counts['Push'] += int(np.count_nonzero(pushes))
+
+    def summarize(self):
+        # Chaque sabot est une portion de la partie : on décale son parcours par l'argent accumulé avant lui
+        offsets = self.initial_money + np.concatenate(([0.0], np.cumsum(self.money)[:-1]))
+        summary = dict(self.counts)
+        mean = self.money.sum() / max(self.rounds, 1)
+        variance = (self.net_squares - self.rounds * mean * mean) / (self.rounds - 1) if self.rounds > 1 else 0.0
+        summary.update({
+            'Final Money': float(self.initial_money + self.money.sum()),
+            'Highest Money': float(np.max(offsets + self.highest_money)),
+            'Lowest Money': float(np.min(offsets + self.lowest_money)),
+            'Remaining Cards': int(self.total_cards - self.positions[-1]),
+            'Total Cards': self.total_cards,
+            'EV per Round': float(mean),
+            'SD per Round': float(np.sqrt(max(variance, 0.0))),
+        })
+        return summary
+
+    def display_stats(self):
+        print_summary(self.summarize())
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (6, 7, 8):
+        print(
+            "Usage: python batch_simulator.py card_count_values.csv betting_system.csv strategy_Ace.csv strategy_Pair.csv strategy_Hard.csv [num_games] [strategy_Deviations.csv]")
+        sys.exit(1)
+
+    simulator = BatchSimulator(*sys.argv[1:6], num_games=int(sys.argv[6]) if len(sys.argv) >= 7 else 1000000,
+                               deviation_file=sys.argv[7] if len(sys.argv) == 8 else None)
+    simulator.simulate()
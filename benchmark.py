@@ -0,0 +1,175 @@
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+from blackjack_simulatorV7 import CARDS, BlackjackSimulator, CardCounter, Deck, Hand, Player, StrategyManager
+
+FILES = ("card_count_values.csv", "betting_system.csv", "strategy_Ace.csv", "strategy_Pair.csv",
+         "strategy_Hard.csv")
+# (nombre de jeux, nombre de parties) pour les simulations complètes
+SIMULATE_CASES = ((1, 10000), (6, 10000), (6, 100000), (8, 100000))
+MICRO_OPERATIONS = 200000
+REPEAT = 5
+DEFAULT_THRESHOLD = 0.10
+
+
+def _best_ns(run, repeat=REPEAT):
+    """ Meilleur temps (ns) sur repeat exécutions de run(), qui renvoie le temps qu'elle a mesuré """
+    return min(run() for _ in range(repeat))
+
+
+def _result(operations, elapsed_ns):
+    return {'ops_per_sec': operations / (elapsed_ns / 1e9), 'ns_per_op': elapsed_ns / operations}
+
+
+def bench_draw_card(num_decks=6, operations=MICRO_OPERATIONS):
+    deck = Deck(num_decks, random.Random(1))
+    counter = CardCounter(FILES[0])
+
+    def run():
+        elapsed, drawn = 0, 0
+        while drawn < operations:
+            deck.shuffle()
+            count = min(deck.remaining, operations - drawn)
+            start = time.perf_counter_ns()
+            for _ in range(count):
+                deck.draw_card(counter)
+            elapsed += time.perf_counter_ns() - start
+            drawn += count
+        return elapsed
+
+    return _result(operations, _best_ns(run))
+
+
+def _random_hands(count, rng):
+    return [Hand(rng.choice(CARDS) for _ in range(rng.choice((2, 2, 2, 3, 4)))) for _ in range(count)]
+
+
+def bench_hand_value(operations=MICRO_OPERATIONS):
+    player = Player()
+    player.hands = _random_hands(1000, random.Random(2))
+    indices = [index % len(player.hands) for index in range(operations)]
+
+    def run():
+        hand_value = player.hand_value
+        start = time.perf_counter_ns()
+        for index in indices:
+            hand_value(index)
+        return time.perf_counter_ns() - start
+
+    return _result(operations, _best_ns(run))
+
+
+def bench_get_action(operations=MICRO_OPERATIONS):
+    strategy_manager = StrategyManager(FILES[3], FILES[2], FILES[4])
+    rng = random.Random(3)
+    player = Player()
+    player.hands = _random_hands(2000, rng)
+    # Une décision ne se prend que sur une main de moins de 21
+    decisions = [(hand, rng.choice(CARDS)) for index, hand in enumerate(player.hands)
+                 if player.hand_value(index) < 21]
+    decisions = [decisions[index % len(decisions)] for index in range(operations)]
+
+    def run():
+        get_action = strategy_manager.get_action
+        start = time.perf_counter_ns()
+        for hand, upcard in decisions:
+            get_action(hand, upcard)
+        return time.perf_counter_ns() - start
+
+    return _result(operations, _best_ns(run))
+
+
+def bench_play_game(num_decks=6, operations=20000):
+    def run():
+        simulator = BlackjackSimulator(*FILES, num_decks=num_decks, seed=4)
+        reshuffle_at = num_decks * 52 * simulator.penetration
+        start = time.perf_counter_ns()
+        for _ in range(operations):
+            simulator.play_game()
+            if simulator.deck.remaining < reshuffle_at:
+                simulator.deck.shuffle()
+                simulator.counters.reset()
+        return time.perf_counter_ns() - start
+
+    return _result(operations, _best_ns(run, repeat=3))
+
+
+def bench_simulate(num_decks, num_games):
+    """ Parties par seconde d'une exécution complète, puis pic mémoire (tracemalloc) sur une seconde exécution """
+    simulator = BlackjackSimulator(*FILES, num_decks=num_decks, num_games=num_games, seed=5)
+    start = time.perf_counter_ns()
+    simulator.run()
+    elapsed = time.perf_counter_ns() - start
+    hands = sum(count for result, count in simulator.stats.counts.items() if result != 'Split')
+
+    simulator = BlackjackSimulator(*FILES, num_decks=num_decks, num_games=num_games, seed=5)
+    tracemalloc.start()
+    simulator.run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    result = _result(num_games, elapsed)
+    result['hands_per_sec'] = hands / (elapsed / 1e9)
+    result['peak_kib'] = peak / 1024
+    return result
+
+
+def run_benchmarks(log=print):
+    results = {}
+
+    def record(name, result):
+        results[name] = result
+        if log:
+            details = f"{result['ops_per_sec']:>12,.0f} ops/s {result['ns_per_op']:>10,.0f} ns/op"
+            if 'peak_kib' in result:
+                details += f" {result['hands_per_sec']:>10,.0f} hands/s {result['peak_kib']:>9,.0f} KiB peak"
+            log(f"{name:<28}{details}")
+
+    record('draw_card', bench_draw_card())
+    record('hand_value', bench_hand_value())
+    record('get_action', bench_get_action())
+    record('play_game', bench_play_game())
+    for num_decks, num_games in SIMULATE_CASES:
+        record(f'simulate_{num_decks}d_{num_games}', bench_simulate(num_decks, num_games))
+    return results
+
+
+def save_baseline(filepath, results):
+    with open(filepath, 'w') as file:
+        json.dump({'python': platform.python_version(), 'machine': platform.machine(), 'results': results},
+                  file, indent=2)
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """ Liste des (nom, débit de référence, débit mesuré) en recul de plus de threshold """
+    regressions = []
+    for name, reference in baseline['results'].items():
+        current = results.get(name)
+        if current and current['ops_per_sec'] < reference['ops_per_sec'] * (1 - threshold):
+            regressions.append((name, reference['ops_per_sec'], current['ops_per_sec']))
+    return regressions
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (1, 3, 4) or (len(sys.argv) > 1 and sys.argv[1] not in ('save', 'compare')):
+        print("Usage: python benchmark.py [save baseline.json | compare baseline.json [threshold]]")
+        sys.exit(1)
+
+    results = run_benchmarks()
+    if len(sys.argv) > 1 and sys.argv[1] == 'save':
+        save_baseline(sys.argv[2], results)
+        print(f"Baseline saved to {sys.argv[2]}")
+    elif len(sys.argv) > 1:
+        with open(sys.argv[2]) as file:
+            baseline = json.load(file)
+        threshold = float(sys.argv[3]) if len(sys.argv) == 4 else DEFAULT_THRESHOLD
+        regressions = compare(results, baseline, threshold)
+        for name, reference, current in regressions:
+            print(f"Regression {name}: {reference:,.0f} -> {current:,.0f} ops/s ({current / reference - 1:+.1%})")
+        if regressions:
+            sys.exit(1)
+        print(f"No regression beyond {threshold:.0%}")
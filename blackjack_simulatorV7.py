@@ -1,56 +1,285 @@
+import csv
+import hashlib
+import math
+import os
+import queue
 import random
-import pandas as pd
 import sys
+import threading
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+CARD_VALUES = ('2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K', 'A')
+RANK_INDEX = {value: rank for rank, value in enumerate(CARD_VALUES)}
+ACE_RANK = RANK_INDEX['A']
+# Valeur "dure" de chaque rang (l'As compte 1)
+RANK_POINTS = (2, 3, 4, 5, 6, 7, 8, 9, 10, 10, 10, 10, 1)
+DEALER_COLUMNS = ('Two', 'Three', 'Four', 'Five', 'Six', 'Seven', 'Eight', 'Nine', 'Ten', 'Jack', 'Queen', 'King', 'Ace')
+
+ACTIONS = ('H', 'S', 'D', 'P', 'SrH', 'SrS')
+ACTION_CODES = {action: code for code, action in enumerate(ACTIONS)}
+HIT, STAND, DOUBLE, SPLIT, SURRENDER_HIT, SURRENDER_STAND = range(len(ACTIONS))
+
+# Tags par rang, dans l'ordre de CARD_VALUES (2, 3, ..., 10, J, Q, K, A)
+COUNT_SYSTEMS = {
+    'Hi-Lo': (1, 1, 1, 1, 1, 0, 0, 0, -1, -1, -1, -1, -1),
+    'KO': (1, 1, 1, 1, 1, 1, 0, 0, -1, -1, -1, -1, -1),
+    'Omega II': (1, 1, 2, 2, 2, 1, 0, -1, -2, -2, -2, -2, 0),
+    'Zen': (1, 1, 2, 2, 2, 1, 0, 0, -2, -2, -2, -2, -1),
+    'Wong Halves': (0.5, 1, 1, 1.5, 1, 0.5, 0, -0.5, -1, -1, -1, -1, -1),
+}
+# Systèmes déséquilibrés joués sur le running count, sans conversion en true count : compte initial par jeu
+# (KO : 4 - 4 x jeux, pivot à +4)
+UNBALANCED_COUNTS = {'KO': lambda num_decks: 4 - 4 * num_decks}
+# Side counts : suivis sur les mêmes cartes, sans mise ni bankroll propres
+SIDE_COUNTS = {
+    'Aces': (0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1),  # As sortis depuis le mélange
+}
 
 
 class Card:
     def __init__(self, value, suit):
         self.value = value
         self.suit = suit
+        self.rank = RANK_INDEX[value]
 
     def __repr__(self):
         return f"{self.value}{self.suit}"
 
 
+def read_csv_rows(filepath):
+    """ CSV à point-virgule lu avec le module csv : (noms de colonnes, lignes en dicts {colonne: texte})
+
+    Les fins de ligne \r, \n et \r\n sont acceptées ; les lignes vides sont ignorées. """
+    with open(filepath, newline='', encoding='utf-8-sig') as file:
+        reader = csv.DictReader(file, delimiter=';')
+        rows = list(reader)
+        return list(reader.fieldnames or ()), rows
+
+
+def _number(text):
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+
+# Les 52 cartes, créées une seule fois ; les sabots ne contiennent que leurs indices
+CARDS = tuple(Card(value, suit) for value in CARD_VALUES for suit in ('H', 'D', 'C', 'S'))
+
+
+class FullShuffle:
+    """ Mélange complet du sabot, quand la pénétration est atteinte """
+    continuous = False
+
+    def __init__(self, rng=random):
+        self.rng = rng
+
+    def shuffle(self, cards):
+        self.rng.shuffle(cards)
+
+
+class ContinuousShuffle(FullShuffle):
+    """ Machine à mélanger en continu : les cartes jouées retournent dans le sabot après chaque partie """
+    continuous = True
+
+    def return_cards(self, cards, remaining):
+        """ Insère chaque carte jouée (cards[remaining:]) à une position aléatoire, comme un mélange de
+        Fisher-Yates qui ne traite que les nouvelles cartes """
+        randrange = self.rng.randrange
+        for index in range(remaining, len(cards)):
+            other = randrange(index + 1)
+            cards[index], cards[other] = cards[other], cards[index]
+
+
+class ReplayShuffle:
+    """ Le sabot numéro n est mélangé avec une graine dérivée de (seed, n) : la même suite de sabots est
+    rejouée d'une exécution à l'autre, et une exécution peut reprendre au sabot first_shoe """
+    continuous = False
+
+    def __init__(self, seed=0, first_shoe=0):
+        self.seed = seed
+        self.shoes = first_shoe
+
+    def shuffle(self, cards):
+        random.Random(derive_seed(self.seed, self.shoes)).shuffle(cards)
+        self.shoes += 1
+
+
+def make_shuffle_model(shuffle, rng=random, seed=None):
+    """ 'full', 'continuous', 'replay' ou un modèle déjà construit (tout objet ayant une méthode shuffle) """
+    if shuffle == 'full':
+        return FullShuffle(rng)
+    if shuffle == 'continuous':
+        return ContinuousShuffle(rng)
+    if shuffle == 'replay':
+        return ReplayShuffle(seed or 0)
+    if hasattr(shuffle, 'shuffle'):
+        return shuffle
+    raise ValueError(f"Unknown shuffle model {shuffle!r}")
+
+
 class Deck:
-    def __init__(self, num_decks=6):
-        self.num_decks = num_decks
-        self.cards = self._generate_deck()
-        random.shuffle(self.cards)
+    """ Sabot de num_decks jeux : indices de CARDS dans un tableau préalloué, tirés depuis la fin avec un curseur
 
-    def _generate_deck(self):
-        values = ['2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K', 'A']
-        suits = ['H', 'D', 'C', 'S']
-        deck = [Card(value, suit) for value in values for suit in suits] * self.num_decks
-        return deck
+    shuffle() remet le tableau dans l'ordre d'origine puis le permute sur place, sans créer de carte. """
+
+    def __init__(self, num_decks=6, rng=random, shuffle_model=None):
+        self.num_decks = num_decks
+        self.shuffle_model = shuffle_model or FullShuffle(rng)
+        self._order = array('B', range(len(CARDS))) * num_decks
+        self.cards = array('B', self._order)
+        self.remaining = 0
+        self.shuffle()
+
+    def shuffle(self):
+        self.cards[:] = self._order
+        self.shuffle_model.shuffle(self.cards)
+        self.remaining = len(self.cards)
+
+    def return_cards(self):
+        """ Machine à mélanger en continu : remet les cartes jouées dans le sabot """
+        self.shuffle_model.return_cards(self.cards, self.remaining)
+        self.remaining = len(self.cards)
 
     def draw_card(self, card_counter):
-        card = self.cards.pop()
-        num_decks_remaining = len(self.cards) / 52
-        card_counter.update_counts(card, num_decks_remaining)
+        if not self.remaining:
+            raise IndexError("draw from an empty shoe")
+        self.remaining -= 1
+        card = CARDS[self.cards[self.remaining]]
+        card_counter.update_counts(card, self.remaining)
         return card
 
 
 class CardCounter:
-    def __init__(self, count_values_file='card_count_values.csv'):
-        self.count_values = self._load_count_values(count_values_file)
-        self.running_count = 0
-        self.true_count = 0
+    """ Running count d'un système de comptage, avec des tags indexés par le rang de la carte (entiers ou
+    fractionnaires)
+
+    Le true count n'est calculé qu'à la lecture, à partir des cartes restantes au dernier tirage. Un système
+    déséquilibré (initial_count donné, comme KO) n'est pas converti : true_count renvoie le running count, qui
+    repart de initial_count à chaque mélange. Les systèmes lus dans un fichier sont supposés équilibrés. """
+
+    def __init__(self, count_values_file='card_count_values.csv', tags=None, name=None, initial_count=None):
+        self.tags = tuple(tags) if tags is not None else self._load_count_values(count_values_file)
+        self.name = name or count_values_file
+        self.initial_count = initial_count
+        self.running_count = initial_count or 0
+        self.cards_remaining = None
 
     def _load_count_values(self, filepath):
-        df = pd.read_csv(filepath, delimiter=';')
-        return dict(zip(df['Card'], df['Value']))
+        count_values = {row['Card']: row['Value'] for row in read_csv_rows(filepath)[1]}
+        return tuple(_number(count_values[value]) for value in CARD_VALUES)
+
+    def update_counts(self, card, cards_remaining):
+        self.running_count += self.tags[card.rank]
+        self.cards_remaining = cards_remaining
+
+    def reset(self):
+        self.running_count = self.initial_count or 0
+
+    @property
+    def true_count(self):
+        if self.initial_count is not None:
+            return self.running_count
+        if self.cards_remaining is None:
+            return 0
+        return self.running_count / (self.cards_remaining / 52)
+
+
+class CounterGroup:
+    """ Plusieurs compteurs mis à jour en une seule passe sur les mêmes cartes """
+
+    def __init__(self, counters):
+        self.counters = tuple(counters)
+
+    def update_counts(self, card, cards_remaining):
+        rank = card.rank
+        for counter in self.counters:
+            counter.running_count += counter.tags[rank]
+            counter.cards_remaining = cards_remaining
+
+    def reset(self):
+        for counter in self.counters:
+            counter.reset()
+
+
+def load_counter(system, num_decks=6):
+    """ Compteur pour un nom de COUNT_SYSTEMS ou SIDE_COUNTS, ou un fichier de valeurs Card;Value """
+    if system in COUNT_SYSTEMS:
+        initial_count = UNBALANCED_COUNTS[system](num_decks) if system in UNBALANCED_COUNTS else None
+        return CardCounter(tags=COUNT_SYSTEMS[system], name=system, initial_count=initial_count)
+    if system in SIDE_COUNTS:
+        return CardCounter(tags=SIDE_COUNTS[system], name=system)
+    return CardCounter(system)
+
+
+class Hand:
+    """ Cartes d'une main et état tenu à jour à chaque carte reçue : total hors As, nombre d'As, rang de la paire
+
+    Se lit comme une liste de cartes (len, index, itération). """
+    __slots__ = ('cards', 'other_sum', 'aces', 'pair_rank')
+
+    def __init__(self, cards=()):
+        self.cards = []
+        self.other_sum = 0
+        self.aces = 0
+        self.pair_rank = -1
+        for card in cards:
+            self.append(card)
+
+    def append(self, card):
+        cards = self.cards
+        cards.append(card)
+        rank = card.rank
+        if rank == ACE_RANK:
+            self.aces += 1
+        else:
+            self.other_sum += RANK_POINTS[rank]
+        self.pair_rank = rank if len(cards) == 2 and cards[0].rank == rank else -1
 
-    def update_counts(self, card, num_decks_remaining):
-        self.running_count += self.count_values[card.value]
-        self.true_count = self.running_count / num_decks_remaining
+    def pop(self):
+        card = self.cards.pop()
+        if card.rank == ACE_RANK:
+            self.aces -= 1
+        else:
+            self.other_sum -= RANK_POINTS[card.rank]
+        self.pair_rank = -1
+        return card
+
+    def clear(self):
+        """ Vide la main sur place, pour la réutiliser à la partie suivante """
+        self.cards.clear()
+        self.other_sum = 0
+        self.aces = 0
+        self.pair_rank = -1
+
+    @property
+    def value(self):
+        """ Total avec un As compté 11 quand c'est possible sans dépasser 21 """
+        value = self.other_sum + self.aces
+        return value + 10 if self.aces and value <= 11 else value
+
+    def __len__(self):
+        return len(self.cards)
+
+    def __getitem__(self, index):
+        return self.cards[index]
+
+    def __iter__(self):
+        return iter(self.cards)
+
+    def __repr__(self):
+        return repr(self.cards)
 
 
 class Player:
     def __init__(self, initial_money=100):
         self.money = initial_money
-        self.hands = [[]]
+        self.hands = [Hand()]
         self.bets = [0]
+        # Mains des splits précédents, vidées et prêtes à resservir
+        self.spare_hands = []
 
     def place_bet(self, amount):
         self.bets[0] = amount
@@ -64,96 +293,291 @@ class Player:
         self.hands[hand_index].append(card)
 
     def reset_hands(self):
-        self.hands = [[]]
-        self.bets = [0]
+        """ Vide les mains sur place plutôt que d'en allouer de nouvelles à chaque partie """
+        hands = self.hands
+        while len(hands) > 1:
+            hand = hands.pop()
+            hand.clear()
+            self.spare_hands.append(hand)
+        hands[0].clear()
+        del self.bets[1:]
+        self.bets[0] = 0
 
     def split_hand(self, hand_index):
         self.money -= self.bets[hand_index]
         second_card = self.hands[hand_index].pop()
-        self.hands.append([second_card])
+        hand = self.spare_hands.pop() if self.spare_hands else Hand()
+        hand.append(second_card)
+        self.hands.append(hand)
         self.bets.append(self.bets[hand_index])
 
     def hand_value(self, hand_index=0):
-        value, aces = 0, 0
-        for card in self.hands[hand_index]:
-            if card.value in ['J', 'Q', 'K']:
-                value += 10
-            elif card.value == 'A':
-                value += 11
-                aces += 1
-            else:
-                value += int(card.value)
-        while value > 21 and aces:
-            value -= 10
-            aces -= 1
-        return value
+        return self.hands[hand_index].value
 
     def has_blackjack(self, hand_index=0):
-        return self.hand_value(hand_index) == 21 and len(self.hands[hand_index]) == 2
+        hand = self.hands[hand_index]
+        return len(hand.cards) == 2 and hand.value == 21
 
     def display_hand(self, hand_index=0):
         return [card.value for card in self.hands[hand_index]]
 
 
 class Dealer(Player):
-    def __init__(self):
+    def __init__(self, hit_soft_17=False):
         super().__init__()
+        if hit_soft_17:
+            self.should_hit = self._should_hit_soft_17
 
     def should_hit(self):
-        return self.hand_value() < 17
+        return self.hands[0].value < 17
+
+    def _should_hit_soft_17(self):
+        hand = self.hands[0]
+        value = hand.value
+        # 17 souple : un As compté 11 (total dur de 7)
+        return value < 17 or (value == 17 and hand.aces > 0 and hand.other_sum + hand.aces == 7)
 
     def reset_hands(self):
-        self.hands = [[]]
+        self.hands[0].clear()
+
+
+class HouseRules:
+    """ Règles de la table, lues une fois à la construction du simulateur
+
+    Les valeurs par défaut sont les règles historiques du simulateur : le croupier reste sur 17 souple, le
+    blackjack paie 3:2, splits illimités (As compris), double après split, abandon à la première décision de
+    chaque main et pas de vérification du blackjack du croupier ; un blackjack du croupier se règle alors comme un
+    21 ordinaire. enhc applique la vraie règle européenne sans carte cachée : le blackjack du croupier, découvert
+    après le jeu, bat toutes les mains qui ne sont pas un blackjack (doubles et splits compris) et fait égalité avec
+    celui du joueur ; enhc et peek s'excluent. surrender vaut 'late', 'early' ou None : 'early' récupère toujours
+    la moitié de la mise, même contre un blackjack du croupier ; 'late' ne la récupère qu'une fois ce blackjack
+    écarté : avec peek, l'abandon n'est proposé qu'après la vérification ; sans peek, une main abandonnée perd toute
+    sa mise si le croupier a un blackjack (voir surrender_lost). max_splits est le nombre de splits par main de
+    départ (None : illimité). """
+
+    def __init__(self, hit_soft_17=False, blackjack_payout=1.5, max_splits=None, resplit_aces=True,
+                 double_after_split=True, surrender='late', peek=False, enhc=False):
+        if surrender not in ('late', 'early', None):
+            raise ValueError(f"Unknown surrender rule {surrender!r}")
+        if peek and enhc:
+            raise ValueError("peek and enhc are mutually exclusive")
+        self.hit_soft_17 = hit_soft_17
+        self.blackjack_payout = blackjack_payout
+        self.max_splits = max_splits
+        self.resplit_aces = resplit_aces
+        self.double_after_split = double_after_split
+        self.surrender = surrender
+        self.peek = peek
+        self.enhc = enhc
+
+    def can_split(self, hands, hand):
+        """ hand est une paire de hands : un nouveau split est-il permis ? """
+        if self.max_splits is not None and len(hands) > self.max_splits:
+            return False
+        # Une paire d'As dans une main déjà splittée vient forcément d'un split d'As
+        return self.resplit_aces or len(hands) == 1 or hand.pair_rank != ACE_RANK
+
+    def surrender_lost(self, dealer):
+        """ Un abandon 'late' sans peek perd toute la mise contre un blackjack du croupier, connu seulement après """
+        return self.surrender == 'late' and not self.peek and dealer.has_blackjack()
+
+    def __repr__(self):
+        return f"HouseRules({', '.join(f'{name}={value!r}' for name, value in vars(self).items())})"
+
+
+# Jeux de règles nommés, utilisables comme BlackjackSimulator(..., rules='H17 DAS LS')
+HOUSE_RULES = {
+    'Default': {},
+    'S17 DAS LS': {'max_splits': 3, 'resplit_aces': False, 'peek': True},
+    'H17 DAS LS': {'hit_soft_17': True, 'max_splits': 3, 'resplit_aces': False, 'peek': True},
+    'H17 6:5': {'hit_soft_17': True, 'blackjack_payout': 1.2, 'max_splits': 3, 'resplit_aces': False,
+                'surrender': None, 'peek': True},
+    'ENHC': {'max_splits': 3, 'resplit_aces': False, 'enhc': True},
+}
+
+
+def load_rules(rules):
+    """ Nom de HOUSE_RULES ou HouseRules déjà construit """
+    if isinstance(rules, HouseRules):
+        return rules
+    if rules in HOUSE_RULES:
+        return HouseRules(**HOUSE_RULES[rules])
+    raise ValueError(f"Unknown house rules {rules!r}")
+
+
+class StrategyTable:
+    """ Table de stratégie telle qu'écrite dans le CSV : clés joueur (première colonne), colonnes du croupier et
+    une ligne {colonne: action} par clé, dans l'ordre du fichier """
+
+    def __init__(self, filepath):
+        fieldnames, self.rows = read_csv_rows(filepath)
+        self.index_name = fieldnames[0]
+        self.columns = fieldnames[1:]
+        self.index = [row[self.index_name] for row in self.rows]
+
+    def set(self, key, column, action):
+        """ Change la première ligne de clé key """
+        if column not in self.columns:
+            raise KeyError(column)
+        self.rows[self.index.index(key)][column] = action
+
+    def save(self, filepath):
+        with open(filepath, 'w', newline='') as file:
+            writer = csv.DictWriter(file, fieldnames=[self.index_name] + self.columns, delimiter=';',
+                                    lineterminator='\n', extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(self.rows)
 
 
 class StrategyManager:
+    SOFT_KEYS = 11  # A0 .. A10
+    HARD_KEYS = 31  # total dur 0 .. 30
+
     def __init__(self, pair_strategy_file='strategy_Pair.csv', ace_strategy_file='strategy_Ace.csv',
-                 hard_strategy_file='strategy_Hard.csv'):
+                 hard_strategy_file='strategy_Hard.csv', deviation_file=None):
         self.pair_strategy = self._load_strategy(pair_strategy_file)
         self.ace_strategy = self._load_strategy(ace_strategy_file)
         self.hard_strategy = self._load_strategy(hard_strategy_file)
+        self.deviations = self._load_deviations(deviation_file) if deviation_file else {}
+        self.compile()
 
     def _load_strategy(self, filepath):
-        return pd.read_csv(filepath, delimiter=';', index_col=0)
-
-    def get_action(self, player_hand, dealer_upcard):
-        dealer_value = dealer_upcard.value
-        dealer_value_map = {
-            '2': 'Two', '3': 'Three', '4': 'Four', '5': 'Five', '6': 'Six', '7': 'Seven',
-            '8': 'Eight', '9': 'Nine', '10': 'Ten', 'J': 'Jack', 'Q': 'Queen', 'K': 'King', 'A': 'Ace'
-        }
-        dealer_value = dealer_value_map[dealer_value]
-
-        try:
-            if len(player_hand) == 2 and player_hand[0].value == player_hand[1].value:
-                pair_value = player_hand[0].value
-                if pair_value in ['J', 'Q', 'K']:
-                    pair_value = '10'
-                return self.pair_strategy.loc[pair_value, dealer_value]
-            elif 'A' in [card.value for card in player_hand]:
-                # Trouver la valeur des cartes autres que l'As
-                other_cards = [card for card in player_hand if card.value != 'A']
-                other_sum = sum(10 if card.value in ['J', 'Q', 'K'] else int(card.value) for card in other_cards)
-                if other_sum <= 10:
-                    ace_value = 'A' + str(other_sum)
-                    if ace_value in self.ace_strategy.index:
-                        return self.ace_strategy.loc[ace_value, dealer_value]
-                    else:
-                        print(f"Debug: Key {ace_value} not found in ace_strategy")
-
-                    # Si la somme dépasse 10 ou si la clé n'est pas trouvée, on traite comme une main dure
-                player_total = self._hard_value(player_hand)
-                return self.hard_strategy.loc[player_total, dealer_value]
+        return StrategyTable(filepath)
+
+    def _load_deviations(self, filepath):
+        """ Index plays : Table;Player;Dealer;Operator;TrueCount;Action, ex. Hard;16;Ten;>=;0;S
+
+        Retourne {(table, clé): [None ou (seuil haut, action, seuil bas, action) par rang du croupier]}. """
+        deviations = {}
+        for row in read_csv_rows(filepath)[1]:
+            table_name, key, dealer, operator, true_count, action = (
+                row['Table'], row['Player'], row['Dealer'], row['Operator'], row['TrueCount'], row['Action'])
+            if table_name not in ('Pair', 'Ace', 'Hard') or dealer not in DEALER_COLUMNS or \
+                    operator not in ('>=', '<') or action not in ACTION_CODES:
+                raise ValueError(f"Invalid deviation {table_name};{key};{dealer};{operator};{true_count};{action}")
+            row = deviations.setdefault((table_name, key), [None] * len(DEALER_COLUMNS))
+            dealer_rank = DEALER_COLUMNS.index(dealer)
+            cell = list(row[dealer_rank] or (math.inf, STAND, -math.inf, STAND))
+            if operator == '>=':
+                cell[0:2] = float(true_count), ACTION_CODES[action]
             else:
-                player_total = self._hard_value(player_hand)
-                return self.hard_strategy.loc[player_total, dealer_value]
-        except KeyError as e:
-            print(f"Debug: KeyError {e} in strategy lookup")
-            return 'S'  # Default to Stand if there's an error
-
-    def _hard_value(self, hand):
-        value = sum([10 if card.value in ['J', 'Q', 'K'] else int(card.value) for card in hand if card.value != 'A'])
-        return value + 1 if 'A' in [card.value for card in hand] and value <= 10 else value
+                cell[2:4] = float(true_count), ACTION_CODES[action]
+            row[dealer_rank] = tuple(cell)
+        return deviations
+
+    @staticmethod
+    def _table_rows(table):
+        # {clé joueur: [code action par rang du croupier]}, la première ligne gagne en cas de doublon
+        columns = [column if column in table.columns else None for column in DEALER_COLUMNS]
+        rows = {}
+        for key, table_row in zip(table.index, table.rows):
+            if key in rows:
+                continue
+            row = []
+            for column in columns:
+                if column is None:
+                    row.append(STAND)
+                    continue
+                action = table_row[column]
+                if action not in ACTION_CODES:
+                    raise ValueError(f"Unknown action {action!r} for player key {key} in strategy table")
+                row.append(ACTION_CODES[action])
+            rows[key] = row
+        return rows
+
+    def compile(self):
+        """ Compile les trois CSV en tables denses (clé joueur x rang du croupier -> code action) """
+        pair_rows = self._table_rows(self.pair_strategy)
+        ace_rows = self._table_rows(self.ace_strategy)
+        hard_rows = self._table_rows(self.hard_strategy)
+        default_row = [STAND] * len(CARD_VALUES)
+
+        self.hard_table = [hard_rows.get(str(total), default_row) for total in range(self.HARD_KEYS)]
+        # Une clé As absente retombe sur la main dure (autres cartes + 1). Une main faite uniquement d'As (paire
+        # d'As dont le split est refusé) est un 12 souple : ligne A1 si elle existe, sinon tirer
+        aces_only_row = ace_rows.get('A1', [HIT] * len(CARD_VALUES))
+        self.soft_table = [ace_rows.get('A' + str(other_sum),
+                                        self.hard_table[other_sum + 1] if other_sum else aces_only_row)
+                           for other_sum in range(self.SOFT_KEYS)]
+        self.pair_table = [pair_rows.get('10' if value in ('J', 'Q', 'K') else value, default_row)
+                           for value in CARD_VALUES]
+
+        # Mêmes clés pour les index plays ; None quand la ligne n'a aucune déviation
+        self.hard_deviations = [self.deviations.get(('Hard', str(total))) for total in range(self.HARD_KEYS)]
+        self.soft_deviations = [self.deviations.get(('Ace', 'A' + str(other_sum)))
+                                if 'A' + str(other_sum) in ace_rows
+                                else self.hard_deviations[other_sum + 1] if other_sum
+                                else self.deviations.get(('Ace', 'A1'))
+                                for other_sum in range(self.SOFT_KEYS)]
+        self.pair_deviations = [self.deviations.get(('Pair', '10' if value in ('J', 'Q', 'K') else value))
+                                for value in CARD_VALUES]
+
+        # Les lignes compilées sont partagées avec table_rows : set_action les modifie sur place
+        self.table_rows = {'Pair': pair_rows, 'Ace': ace_rows, 'Hard': hard_rows}
+        # (table, clé CSV) -> cases compilées (voir slot) qui lisent cette ligne
+        self.cell_slots = {}
+        for total in range(self.HARD_KEYS):
+            if str(total) in hard_rows:
+                self.cell_slots.setdefault(('Hard', str(total)), []).append(('hard', total))
+        for other_sum in range(self.SOFT_KEYS):
+            if 'A' + str(other_sum) in ace_rows:
+                self.cell_slots.setdefault(('Ace', 'A' + str(other_sum)), []).append(('soft', other_sum))
+            elif not other_sum:
+                if 'A1' in ace_rows:
+                    self.cell_slots.setdefault(('Ace', 'A1'), []).append(('soft', other_sum))
+            elif str(other_sum + 1) in hard_rows:
+                self.cell_slots.setdefault(('Hard', str(other_sum + 1)), []).append(('soft', other_sum))
+        for rank, value in enumerate(CARD_VALUES):
+            key = '10' if value in ('J', 'Q', 'K') else value
+            if key in pair_rows:
+                self.cell_slots.setdefault(('Pair', key), []).append(('pair', rank))
+
+    def table(self, table_name):
+        return {'Pair': self.pair_strategy, 'Ace': self.ace_strategy, 'Hard': self.hard_strategy}[table_name]
+
+    def set_action(self, table_name, key, dealer_rank, action):
+        """ Change une case ('Pair', 'Ace' ou 'Hard', clé CSV, rang du croupier) sans recompiler """
+        self.table(table_name).set(key, DEALER_COLUMNS[dealer_rank], action)
+        self.table_rows[table_name][key][dealer_rank] = ACTION_CODES[action]
+
+    def save(self, pair_strategy_file, ace_strategy_file, hard_strategy_file):
+        for table, filepath in ((self.pair_strategy, pair_strategy_file), (self.ace_strategy, ace_strategy_file),
+                                (self.hard_strategy, hard_strategy_file)):
+            table.save(filepath)
+
+    def slot(self, pair_rank, has_ace, other_sum):
+        """ Case compilée lue par lookup pour cette clé """
+        if pair_rank >= 0:
+            return 'pair', pair_rank
+        if has_ace and other_sum <= 10:
+            return 'soft', other_sum
+        return 'hard', other_sum
+
+    def lookup(self, pair_rank, has_ace, other_sum, dealer_rank, true_count=None):
+        if pair_rank >= 0:
+            action, deviations = self.pair_table[pair_rank][dealer_rank], self.pair_deviations[pair_rank]
+        elif has_ace and other_sum <= 10:
+            action, deviations = self.soft_table[other_sum][dealer_rank], self.soft_deviations[other_sum]
+        else:
+            action, deviations = self.hard_table[other_sum][dealer_rank], self.hard_deviations[other_sum]
+        if deviations is None or true_count is None:
+            return action
+        deviation = deviations[dealer_rank]
+        if deviation is None:
+            return action
+        if true_count >= deviation[0]:
+            return deviation[1]
+        if true_count < deviation[2]:
+            return deviation[3]
+        return action
+
+    def get_action_code(self, player_hand, dealer_upcard, true_count=None):
+        """ player_hand est une Hand : la clé de stratégie se lit directement dans son état """
+        return self.lookup(player_hand.pair_rank, player_hand.aces > 0, player_hand.other_sum, dealer_upcard.rank,
+                           true_count)
+
+    def get_action(self, player_hand, dealer_upcard, true_count=None):
+        return ACTIONS[self.get_action_code(player_hand, dealer_upcard, true_count)]
 
 
 class BettingSystem:
@@ -161,79 +585,396 @@ class BettingSystem:
         self.betting_strategy = self._load_betting_strategy(betting_file)
 
     def _load_betting_strategy(self, filepath):
-        df = pd.read_csv(filepath, delimiter=';')
-        return dict(zip(df['TrueCount'], df['Bet']))
+        return {int(row['TrueCount']): _number(row['Bet']) for row in read_csv_rows(filepath)[1]}
 
     def get_bet(self, true_count):
         return self.betting_strategy.get(int(true_count), 10)
 
 
+class SimulationStats:
+    """ Statistiques agrégées au fil de l'eau, en mémoire constante """
+    RESULTS = ('Player', 'Dealer', 'Surrender', 'Push', 'Split')
+
+    def __init__(self, initial_money=0):
+        self.counts = dict.fromkeys(self.RESULTS, 0)
+        self.initial_money = initial_money
+        self.final_money = initial_money
+        self.highest_money = -math.inf
+        self.lowest_money = math.inf
+        self.last_result = None
+        # Gain net par partie (algorithme de Welford)
+        self.rounds = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        # int(true count) -> [parties, gain net, gain net au carré, mises]
+        self.true_counts = {}
+        # (int(true count), gain net / mise initiale) -> parties : distribution des issues par true count. Les
+        # parties sans mise (bet 0, joueur assis) n'y figurent pas : elles ne restent que dans true_counts
+        self.outcomes = {}
+
+    def record_hand(self, result, money):
+        self.counts[result] += 1
+        self.last_result = result
+        self.record_money(money)
+
+    def record_money(self, money):
+        self.final_money = money
+        if money > self.highest_money:
+            self.highest_money = money
+        if money < self.lowest_money:
+            self.lowest_money = money
+
+    def record_round(self, net, true_count, bet):
+        self.rounds += 1
+        delta = net - self.mean
+        self.mean += delta / self.rounds
+        self.m2 += delta * (net - self.mean)
+        true_count = int(true_count)
+        tally = self.true_counts.get(true_count)
+        if tally is None:
+            tally = self.true_counts[true_count] = [0, 0.0, 0.0, 0.0]
+        tally[0] += 1
+        tally[1] += net
+        tally[2] += net * net
+        tally[3] += bet
+        if bet:
+            outcome = (true_count, net / bet)
+            self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+
+    @property
+    def variance(self):
+        return self.m2 / (self.rounds - 1) if self.rounds > 1 else 0.0
+
+    def merge(self, other):
+        """ Ajoute les parties de other comme si elles avaient été jouées après celles-ci """
+        offset = self.final_money - other.initial_money
+        for result, count in other.counts.items():
+            self.counts[result] += count
+        self.highest_money = max(self.highest_money, other.highest_money + offset)
+        self.lowest_money = min(self.lowest_money, other.lowest_money + offset)
+        self.final_money = other.final_money + offset
+        if other.last_result is not None:
+            self.last_result = other.last_result
+
+        rounds = self.rounds + other.rounds
+        if rounds:
+            delta = other.mean - self.mean
+            self.m2 += other.m2 + delta * delta * self.rounds * other.rounds / rounds
+            self.mean += delta * other.rounds / rounds
+            self.rounds = rounds
+        for true_count, tally in other.true_counts.items():
+            merged = self.true_counts.setdefault(true_count, [0, 0.0, 0.0, 0.0])
+            for index, value in enumerate(tally):
+                merged[index] += value
+        for outcome, count in other.outcomes.items():
+            self.outcomes[outcome] = self.outcomes.get(outcome, 0) + count
+        return self
+
+    def summary(self):
+        summary = dict(self.counts)
+        summary.update({
+            'Final Money': self.final_money,
+            # Sans aucune partie, la bankroll n'a jamais quitté son montant initial
+            'Highest Money': self.highest_money if self.highest_money > -math.inf else self.final_money,
+            'Lowest Money': self.lowest_money if self.lowest_money < math.inf else self.final_money,
+            'EV per Round': self.mean,
+            'SD per Round': math.sqrt(self.variance),
+        })
+        return summary
+
+
+class HandHistory:
+    """ Journal complet des mains (ancien comportement de log_result), à brancher dans simulator.sinks """
+
+    def __init__(self, echo=False):
+        self.echo = echo
+        self.results = []
+
+    def write(self, simulator, result, player_actions, dealer_actions, hand_index):
+        remaining_cards = simulator.deck.remaining
+        total_cards = simulator.num_decks * 52
+        percentage_remaining = (remaining_cards / total_cards) * 100
+        log = {
+            'Bet': simulator.player.bets[hand_index],
+            'Player Hand': simulator.player.display_hand(hand_index),
+            'Player Total': simulator.player.hand_value(hand_index),
+            'Dealer Hand': simulator.dealer.display_hand(),
+            'Dealer Total': simulator.dealer.hand_value(),
+            'Result': result,
+            'Player Money': simulator.player.money,
+            'Running Count': simulator.card_counter.running_count,
+            'True Count': f"{simulator.card_counter.true_count:.2f}",
+            'Remaining Cards': remaining_cards,
+            'Percentage Remaining': f"{percentage_remaining:.2f}%",
+            'Player Actions': player_actions
+        }
+        self.results.append(log)
+        if self.echo:
+            print(log)
+
+
+class MoneyHistory:
+    """ Argent du joueur après chaque main journalisée """
+
+    def __init__(self):
+        self.money = array('d')
+
+    def write(self, simulator, result, player_actions, dealer_actions, hand_index):
+        self.money.append(simulator.player.money)
+
+
+class SimulationProfiler:
+    """ Instrumentation optionnelle : remplace les méthodes de phase de l'instance par des versions chronométrées
+
+    Sans profiler, aucune méthode n'est modifiée et rien n'est mesuré. Les phases imbriquées (strategy dans player,
+    log_result dans settle) sont aussi comptées dans leur phase parente. """
+
+    def __init__(self, simulator):
+        self.phases = {}
+        self.actions = dict.fromkeys(ACTIONS, 0)
+        for phase, owner, name in (('play_game', simulator, 'play_game'), ('deal', simulator, '_deal'),
+                                   ('player', simulator, '_play_hands'),
+                                   ('strategy', simulator.strategy_manager, 'get_action'),
+                                   ('dealer', simulator, 'dealer_turn'), ('settle', simulator, '_settle'),
+                                   ('log_result', simulator, 'log_result')):
+            setattr(owner, name, self._timed(phase, getattr(owner, name)))
+        simulator.player_turn = self._counted(simulator.player_turn)
+
+    def _timed(self, phase, method):
+        tally = self.phases[phase] = [0, 0]  # appels, nanosecondes cumulées
+        clock = time.perf_counter_ns
+
+        def timed(*args):
+            start = clock()
+            try:
+                return method(*args)
+            finally:
+                tally[0] += 1
+                tally[1] += clock() - start
+        return timed
+
+    def _counted(self, method):
+        counts = self.actions
+
+        def counted(*args):
+            actions = method(*args)
+            for action in actions:
+                counts[action] += 1
+            return actions
+        return counted
+
+    def report(self):
+        total = self.phases['play_game'][1] or 1
+        print(f"{'Phase':<12}{'Calls':>12}{'Total (ms)':>14}{'Share':>9}{'ns/call':>12}")
+        for phase, (calls, elapsed) in self.phases.items():
+            print(f"{phase:<12}{calls:>12}{elapsed / 1e6:>14.1f}{elapsed / total:>9.1%}"
+                  f"{elapsed / calls if calls else 0:>12.0f}")
+        decisions = sum(self.actions.values())
+        print("Decisions: " + ", ".join(f"{action} {count} ({count / (decisions or 1):.1%})"
+                                        for action, count in self.actions.items()))
+
+
 class BlackjackSimulator:
     def __init__(self, count_values_file, betting_file, ace_strategy_file, pair_strategy_file, hard_strategy_file,
-                 num_decks=6, penetration=0.6, base_bet=10, initial_money=100, num_games=100):
+                 num_decks=6, penetration=0.6, base_bet=10, initial_money=100, num_games=100, seed=None,
+                 verbose=False, deviation_file=None, count_systems=(), shuffle='full', profile=False,
+                 rules='Default'):
+        self.config = {
+            'count_values_file': count_values_file, 'betting_file': betting_file,
+            'ace_strategy_file': ace_strategy_file, 'pair_strategy_file': pair_strategy_file,
+            'hard_strategy_file': hard_strategy_file, 'num_decks': num_decks, 'penetration': penetration,
+            'base_bet': base_bet, 'deviation_file': deviation_file, 'count_systems': tuple(count_systems),
+            'shuffle': shuffle, 'rules': rules,
+        }
         self.num_decks = num_decks
         self.penetration = penetration
         self.base_bet = base_bet
+        self.initial_money = initial_money
         self.num_games = num_games
-        self.deck = Deck(self.num_decks)
+        # Générateur propre au simulateur si une graine est donnée, sinon le module random global
+        self.seed = seed
+        self.rng = random.Random(seed) if seed is not None else random
+        self.shuffle_model = make_shuffle_model(shuffle, self.rng, seed)
+        self.deck = Deck(self.num_decks, shuffle_model=self.shuffle_model)
         self.card_counter = CardCounter(count_values_file)
+        # Systèmes comparés sur les mêmes cartes : mêmes décisions, mise et bankroll propres à chacun
+        self.shadow_counters = [load_counter(system, num_decks) for system in count_systems
+                                if system not in SIDE_COUNTS]
+        self.count_stats = {counter.name: SimulationStats(initial_money) for counter in self.shadow_counters}
+        # Side counts (As, ...) : running count seulement, lu par exemple dans side_counters['Aces']
+        self.side_counters = {system: load_counter(system) for system in count_systems if system in SIDE_COUNTS}
+        extra_counters = self.shadow_counters + list(self.side_counters.values())
+        self.counters = CounterGroup([self.card_counter] + extra_counters) if extra_counters else self.card_counter
         self.player = Player(initial_money)
-        self.dealer = Dealer()
-        self.strategy_manager = StrategyManager(pair_strategy_file, ace_strategy_file, hard_strategy_file)
+        self.rules = load_rules(rules)
+        self.dealer = Dealer(self.rules.hit_soft_17)
+        self.strategy_manager = StrategyManager(pair_strategy_file, ace_strategy_file, hard_strategy_file,
+                                                deviation_file)
         self.betting_system = BettingSystem(betting_file)
-        self.results = []
+        self.stats = SimulationStats(initial_money)
+        self.sinks = []
+        if verbose:
+            self.sinks.append(HandHistory(echo=True))
+        self.profiler = SimulationProfiler(self) if profile else None
 
     def simulate(self):
+        self.run()
+        self.display_stats()
+        if self.profiler:
+            self.profiler.report()
+
+    def run(self):
         for _ in range(self.num_games):
             self.play_game()
-            if len(self.deck.cards) < self.num_decks * 52 * self.penetration:
-                self.deck = Deck(self.num_decks)
-
-        self.display_stats()
+            if self.shuffle_model.continuous:
+                self.deck.return_cards()
+                self.counters.reset()
+            elif self.deck.remaining < self.num_decks * 52 * self.penetration:
+                self.deck.shuffle()
+                self.counters.reset()  # Nouveau sabot : le comptage repart de zéro
+
+    def simulate_parallel(self, num_games, workers=None, seed=0, keep_history=False):
+        """ Répartit num_games entre plusieurs processus, chacun avec sa propre graine dérivée de seed
+
+        Le résultat fusionné ne dépend que de seed et du nombre de workers. """
+        stats, count_stats, remaining_cards, history = self.run_parallel(num_games, workers, seed, keep_history)
+        summary = stats.summary()
+        if count_stats:
+            summary['Count Systems'] = {name: shadow_stats.summary() for name, shadow_stats in count_stats.items()}
+        summary['Remaining Cards'] = remaining_cards
+        summary['Total Cards'] = self.num_decks * 52
+        if keep_history:
+            summary['Money History'] = history
+        print_summary(summary)
+        return summary
+
+    def run_parallel(self, num_games, workers=None, seed=0, keep_history=False):
+        """ Comme simulate_parallel, sans affichage : (stats, stats des autres systèmes, cartes restantes,
+        historique de l'argent)
+
+        Chaque worker reconstruit son modèle de mélange à partir de sa graine : seuls les modèles nommés sont
+        acceptés, un modèle déjà construit ferait jouer les mêmes cartes à tous les workers. """
+        if not isinstance(self.config['shuffle'], str):
+            raise ValueError("Parallel runs need a named shuffle model ('full', 'continuous' or 'replay')")
+        workers = workers or os.cpu_count()
+        jobs = [(self.config, num_games // workers + (index < num_games % workers), derive_seed(seed, index),
+                 keep_history) for index in range(workers)]
+        jobs = [job for job in jobs if job[1]]
+        if len(jobs) <= 1:
+            outcomes = [_simulate_worker(job) for job in jobs]
+        else:
+            with ProcessPoolExecutor(max_workers=len(jobs)) as executor:
+                outcomes = list(executor.map(_simulate_worker, jobs))
+
+        stats = SimulationStats(self.initial_money)
+        count_stats = {name: SimulationStats(self.initial_money) for name in self.count_stats}
+        history = array('d')
+        for worker_stats, _, money_history, worker_count_stats in outcomes:
+            if keep_history:
+                offset = stats.final_money
+                history.extend(offset + money for money in money_history)
+            stats.merge(worker_stats)
+            for name, shadow_stats in worker_count_stats.items():
+                count_stats[name].merge(shadow_stats)
+        remaining_cards = outcomes[-1][1] if outcomes else self.num_decks * 52
+        return stats, count_stats, remaining_cards, history
 
     def play_game(self):
+        start_money, true_count, bet, shadow_bets = self._deal()
+
+        if self.rules.peek and self.dealer.has_blackjack():
+            self._settle_dealer_blackjack()
+        elif self.player.has_blackjack():
+            if self.rules.enhc and self.dealer.has_blackjack():
+                result = 'Push'
+                self.player.money += self.player.bets[0]
+            else:
+                result = 'Player'
+                self.player.money += self.player.bets[0] + self.player.bets[0] * self.rules.blackjack_payout
+            self.log_result(result, [], [], 0)
+        else:
+            player_actions = self._play_hands()
+            dealer_actions = self.dealer_turn()
+            self._settle(player_actions, dealer_actions)
+
+        net = self.player.money - start_money
+        self.stats.record_round(net, true_count, bet)
+        # Le gain est proportionnel à la mise initiale (doubles, splits et surrender compris). Sans mise du
+        # système principal, la partie ne dit rien du gain des autres : elle leur est comptée sans mise ni gain
+        for counter, (shadow_count, shadow_bet) in zip(self.shadow_counters, shadow_bets):
+            shadow_stats = self.count_stats[counter.name]
+            if bet:
+                shadow_net = net * shadow_bet / bet
+            else:
+                shadow_net = shadow_bet = 0
+            shadow_stats.record_money(shadow_stats.final_money + shadow_net)
+            shadow_stats.record_round(shadow_net, shadow_count, shadow_bet)
+
+    def _deal(self):
+        """ Mise puis donne initiale ; renvoie (argent avant la mise, true count, mise, mises des autres systèmes) """
         self.player.reset_hands()
         self.dealer.reset_hands()
-        self.player.place_bet(self.betting_system.get_bet(self.card_counter.true_count))
-
-        self.player.receive_card(self.deck.draw_card(self.card_counter))
-        self.dealer.receive_card(self.deck.draw_card(self.card_counter))
-        self.player.receive_card(self.deck.draw_card(self.card_counter))
-        self.dealer.receive_card(self.deck.draw_card(self.card_counter))
-
-        if len(self.deck.cards) < self.num_decks * 52 * (1 - self.penetration):
+        start_money = self.player.money
+        true_count = self.card_counter.true_count
+        bet = self.betting_system.get_bet(true_count)
+        self.player.place_bet(bet)
+        shadow_bets = [(counter.true_count, self.betting_system.get_bet(counter.true_count))
+                       for counter in self.shadow_counters]
+
+        self.player.receive_card(self.deck.draw_card(self.counters))
+        self.dealer.receive_card(self.deck.draw_card(self.counters))
+        self.player.receive_card(self.deck.draw_card(self.counters))
+        self.dealer.receive_card(self.deck.draw_card(self.counters))
+
+        if self.deck.remaining < self.num_decks * 52 * (1 - self.penetration):
             print(f"🔄 Remélange du deck (Pénétration : {self.penetration * 100:.0f}%)")
-            self.deck = Deck(self.num_decks)  # Nouveau deck mélangé
-            self.card_counter.running_count = 0  # Réinitialiser le running count
+            self.deck.shuffle()  # Même sabot, remélangé sur place
+            self.counters.reset()  # Réinitialiser le running count
+        return start_money, true_count, bet, shadow_bets
 
+    def _settle_dealer_blackjack(self):
+        """ Peek : le croupier a un blackjack, la partie s'arrête avant toute décision du joueur """
         if self.player.has_blackjack():
-            self.player.money += self.player.bets[0] * 2.5
-            result = 'Player'
-            self.log_result(result, [], [], 0)
+            result = 'Push'
+            self.player.money += self.player.bets[0]
+        elif self.rules.surrender == 'early' and self.strategy_manager.get_action(
+                self.player.hands[0], self.dealer.hands[0][0],
+                self.card_counter.true_count if self.strategy_manager.deviations else None) in ('SrH', 'SrS'):
+            result = 'Surrender'
+            self.player.money += self.player.bets[0] // 2
+            self.player.bets[0] = 0
         else:
-            hand_indices = list(range(len(self.player.hands)))
-            player_actions = [[] for _ in hand_indices]
+            result = 'Dealer'
+        self.log_result(result, [], ['S'], 0)
 
-            for hand_index in hand_indices:
-                actions = self.player_turn(hand_index, player_actions)
-                player_actions[hand_index].extend(actions)
+    def _play_hands(self):
+        hand_indices = list(range(len(self.player.hands)))
+        player_actions = [[] for _ in hand_indices]
 
-            dealer_actions = self.dealer_turn()
+        for hand_index in hand_indices:
+            actions = self.player_turn(hand_index, player_actions)
+            player_actions[hand_index].extend(actions)
+        return player_actions
 
-            for hand_index in range(len(self.player.hands)):
-                result = self.determine_winner(hand_index)
-                self.update_money(result, hand_index)
-                self.log_result(result, player_actions[hand_index], dealer_actions, hand_index)
+    def _settle(self, player_actions, dealer_actions):
+        for hand_index in range(len(self.player.hands)):
+            result = self.determine_winner(hand_index)
+            self.update_money(result, hand_index)
+            self.log_result(result, player_actions[hand_index], dealer_actions, hand_index)
 
     def player_turn(self, hand_index, player_actions):
         actions = []
-        surrender_allowed = True
-        double_allowed = True
+        surrender_allowed = self.rules.surrender is not None
+        double_allowed = self.rules.double_after_split or len(self.player.hands) == 1
         while True:
+            true_count = self.card_counter.true_count if self.strategy_manager.deviations else None
             action = self.strategy_manager.get_action(self.player.hands[hand_index],
-                                                      self.dealer.hands[0][0])  # Access the dealer's upcard correctly
-            if isinstance(action, pd.Series):
-                action = action.values[0]
+                                                      self.dealer.hands[0][0],  # Access the dealer's upcard correctly
+                                                      true_count)
+            if action == 'P' and not self.rules.can_split(self.player.hands, self.player.hands[hand_index]):
+                hand = self.player.hands[hand_index]
+                action = ACTIONS[self.strategy_manager.lookup(-1, hand.aces > 0, hand.other_sum,
+                                                              self.dealer.hands[0][0].rank, true_count)]
 
             if action == 'SrH' and not surrender_allowed:
                 action = 'H'
@@ -245,27 +986,28 @@ class BlackjackSimulator:
             actions.append(action)
 
             if action == 'H':
-                self.player.receive_card(self.deck.draw_card(self.card_counter), hand_index)
+                self.player.receive_card(self.deck.draw_card(self.counters), hand_index)
                 surrender_allowed = False
                 double_allowed = False
             elif action == 'S':
                 break
             elif action == 'D':
                 self.player.double_bet(hand_index)
-                self.player.receive_card(self.deck.draw_card(self.card_counter), hand_index)
+                self.player.receive_card(self.deck.draw_card(self.counters), hand_index)
                 break
             elif action == 'P':
                 self.log_result('Split', actions, [], hand_index)
                 self.player.split_hand(hand_index)
                 player_actions.append([])  # Ensure player_actions list is updated for the new hand
                 for new_hand_index in [hand_index, len(self.player.hands) - 1]:
-                    self.player.receive_card(self.deck.draw_card(self.card_counter), new_hand_index)
+                    self.player.receive_card(self.deck.draw_card(self.counters), new_hand_index)
                     split_actions = self.player_turn(new_hand_index, player_actions)
                     player_actions[new_hand_index].extend(split_actions)
                 return actions
             elif action in ['SrH', 'SrS']:
                 if surrender_allowed:
-                    self.player.money += self.player.bets[hand_index] // 2
+                    if not self.rules.surrender_lost(self.dealer):
+                        self.player.money += self.player.bets[hand_index] // 2
                     self.player.bets[hand_index] = 0
                     return actions
                     break
@@ -278,19 +1020,22 @@ class BlackjackSimulator:
         actions = []
         while self.dealer.should_hit():
             actions.append('H')
-            self.dealer.receive_card(self.deck.draw_card(self.card_counter))
+            self.dealer.receive_card(self.deck.draw_card(self.counters))
         actions.append('S')
         return actions
 
     def determine_winner(self, hand_index):
 
         if self.player.bets[hand_index] == 0:
-            return 'Surrender'
+            return 'Dealer' if self.rules.surrender_lost(self.dealer) else 'Surrender'
         player_value = self.player.hand_value(hand_index)
         dealer_value = self.dealer.hand_value()
 
         if player_value > 21:
             return 'Dealer'
+        # ENHC : le blackjack du croupier bat aussi les 21 en plus de deux cartes
+        if self.rules.enhc and self.dealer.has_blackjack():
+            return 'Dealer'
         if dealer_value > 21 or player_value > dealer_value:
             return 'Player'
         if player_value < dealer_value:
@@ -304,76 +1049,124 @@ class BlackjackSimulator:
             self.player.money += self.player.bets[hand_index]
 
     def log_result(self, result, player_actions, dealer_actions, hand_index):
-        remaining_cards = len(self.deck.cards)
-        total_cards = self.num_decks * 52
-        percentage_remaining = (remaining_cards / total_cards) * 100
-        log = {
-            'Bet': self.player.bets[hand_index],
-            'Player Hand': self.player.display_hand(hand_index),
-            'Player Total': self.player.hand_value(hand_index),
-            'Dealer Hand': self.dealer.display_hand(),
-            'Dealer Total': self.dealer.hand_value(),
-            'Result': result,
-            'Player Money': self.player.money,
-            'Running Count': self.card_counter.running_count,
-            'True Count': f"{self.card_counter.true_count:.2f}",
-            'Remaining Cards': remaining_cards,
-            'Percentage Remaining': f"{percentage_remaining:.2f}%",
-            'Player Actions': player_actions
-        }
-        self.results.append(log)
-        print(log)
+        self.stats.record_hand(result, self.player.money)
+        for sink in self.sinks:
+            sink.write(self, result, player_actions, dealer_actions, hand_index)
+
+    def summarize(self):
+        summary = self.stats.summary()
+        summary['Final Money'] = self.player.money
+        summary['Remaining Cards'] = self.deck.remaining
+        summary['Total Cards'] = self.num_decks * 52
+        if self.count_stats:
+            summary['Count Systems'] = {name: stats.summary() for name, stats in self.count_stats.items()}
+        return summary
 
     def display_stats(self):
-        wins = len([result for result in self.results if result['Result'] == 'Player'])
-        losses = len([result for result in self.results if result['Result'] == 'Dealer'])
-        surrenders = len([result for result in self.results if result['Result'] == 'Surrender'])
-        pushes = len([result for result in self.results if result['Result'] == 'Push'])
-        total_games = len(self.results) - len([result for result in self.results if result['Result'] == 'Split'])
-        highest_money = max(result['Player Money'] for result in self.results)
-        lowest_money = min(result['Player Money'] for result in self.results)
-        total_cards = self.num_decks * 52
-        remaining_cards = len(self.deck.cards)
-        percentage_remaining = (remaining_cards / total_cards) * 100
-
-        print(f"Simulation finished. Total games: {total_games}")
-        print(f"Player wins: {wins} ({wins / total_games * 100:.2f}%)")
-        print(f"Dealer wins: {losses} ({losses / total_games * 100:.2f}%)")
-        print(f"Surrenders: {surrenders} ({surrenders / total_games * 100:.2f}%)")
-        print(f"Pushes: {pushes} ({pushes / total_games * 100:.2f}%)")
-        print(f"Player's final money: {self.player.money}")
-        print(f"Highest money: {highest_money}")
-        print(f"Lowest money: {lowest_money}")
+        print_summary(self.summarize())
+
+
+def derive_seed(seed, index):
+    """ Graine 64 bits stable pour le worker index (indépendante du PYTHONHASHSEED) """
+    digest = hashlib.sha256(f"{seed}:{index}".encode()).digest()
+    return int.from_bytes(digest[:8], 'little')
+
+
+def _simulate_worker(job):
+    config, num_games, seed, keep_history = job
+    simulator = BlackjackSimulator(**config, initial_money=0, num_games=num_games, seed=seed)
+    money_history = MoneyHistory()
+    if keep_history:
+        simulator.sinks.append(money_history)
+    simulator.run()
+    return simulator.stats, simulator.deck.remaining, money_history.money, simulator.count_stats
+
+
+def print_summary(summary):
+    wins = summary['Player']
+    losses = summary['Dealer']
+    surrenders = summary['Surrender']
+    pushes = summary['Push']
+    total_games = wins + losses + surrenders + pushes
+    share = 100 / (total_games or 1)
+
+    print(f"Simulation finished. Total games: {total_games}")
+    print(f"Player wins: {wins} ({wins * share:.2f}%)")
+    print(f"Dealer wins: {losses} ({losses * share:.2f}%)")
+    print(f"Surrenders: {surrenders} ({surrenders * share:.2f}%)")
+    print(f"Pushes: {pushes} ({pushes * share:.2f}%)")
+    print(f"Player's final money: {summary['Final Money']}")
+    print(f"Highest money: {summary['Highest Money']}")
+    print(f"Lowest money: {summary['Lowest Money']}")
+    if 'Remaining Cards' in summary:
+        remaining_cards = summary['Remaining Cards']
+        percentage_remaining = (remaining_cards / summary['Total Cards']) * 100
         print(f"Remaining cards: {remaining_cards} ({percentage_remaining:.2f}%)")
+    if 'EV per Round' in summary:
+        print(f"EV per game: {summary['EV per Round']:.4f} (SD {summary['SD per Round']:.4f})")
+    for name, system in summary.get('Count Systems', {}).items():
+        print(f"{name}: final money {system['Final Money']:.1f}, lowest {system['Lowest Money']:.1f}, "
+              f"EV per game {system['EV per Round']:.4f} (SD {system['SD per Round']:.4f})")
+
+
+class MinMaxBuckets:
+    """ Série réduite à au plus max_buckets seaux (minimum, maximum) de largeur égale
+
+    Quand tous les seaux sont pleins, ils sont fusionnés deux à deux et la largeur double : la mémoire et le
+    nombre de points à tracer ne dépendent pas du nombre de valeurs ajoutées. """
+
+    def __init__(self, max_buckets=512):
+        self.max_buckets = max_buckets - max_buckets % 2
+        self.width = 1
+        self.count = 0
+        self.lows = []
+        self.highs = []
+
+    def append(self, value):
+        if self.count % self.width == 0:
+            if len(self.lows) == self.max_buckets:
+                self._merge_pairs()  # count est alors un multiple de la nouvelle largeur
+            self.lows.append(value)
+            self.highs.append(value)
+        else:
+            if value < self.lows[-1]:
+                self.lows[-1] = value
+            if value > self.highs[-1]:
+                self.highs[-1] = value
+        self.count += 1
+
+    def _merge_pairs(self):
+        self.lows = [min(self.lows[i], self.lows[i + 1]) for i in range(0, len(self.lows), 2)]
+        self.highs = [max(self.highs[i], self.highs[i + 1]) for i in range(0, len(self.highs), 2)]
+        self.width *= 2
+
+    def points(self):
+        """ (x, y) à tracer : le minimum puis le maximum de chaque seau, x compté à partir de 1 """
+        xs, ys = [], []
+        half = self.width / 2
+        for index, (low, high) in enumerate(zip(self.lows, self.highs)):
+            x = index * self.width + 1
+            xs += (x, x + half)
+            ys += (low, high)
+        return xs, ys
 
 
-if __name__ == "__main__":
-    if len(sys.argv) != 6:
-        print(
-            "Usage: python blackjack_simulatorV5.py card_count_values.csv betting_system.csv strategy_Ace.csv strategy_Pair.csv strategy_Hard.csv")
-        sys.exit(1)
-    card_count_values_file = sys.argv[1]
-    betting_system_file = sys.argv[2]
-    strategy_ace_file = sys.argv[3]
-    strategy_pair_file = sys.argv[4]
-    strategy_hard_file = sys.argv[5]
-
-    simulator = BlackjackSimulator(card_count_values_file, betting_system_file, strategy_ace_file, strategy_pair_file,
-                                   strategy_hard_file, num_games=10)
-    simulator.simulate()
-
-import threading
-import tkinter as tk
-import seaborn as sns
-from matplotlib.figure import Figure
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-
 class BlackjackGUI:
+    RESULT_COLORS = {'Player': 'green', 'Dealer': 'red', 'Surrender': 'purple', 'Push': 'orange'}
+    REFRESH_MS = 100
+
     def __init__(self, root, simulator):
+        # Chargés seulement quand l'interface est ouverte : le simulateur s'importe sans matplotlib
+        import tkinter as tk
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        from matplotlib.figure import Figure
+
         self.root = root
         self.simulator = simulator
         self.root.title("Blackjack Simulator")
         self.root.state('zoomed')  # Plein écran
+        # Instantanés envoyés par le thread de simulation, lus par la boucle Tk
+        self.updates = queue.Queue()
 
         # Champ pour saisir le nombre de parties
         self.num_games_label = tk.Label(root, text="Nombre de parties:")
@@ -398,23 +1191,30 @@ class BlackjackGUI:
 
         # Graphique pour l'évolution de l'argent
         self.ax_money = self.figure.add_subplot(211)
-        self.ax_money.set_title("Évolution de l'Argent")
-        self.ax_money.set_xlabel("Nombre de parties")
-        self.ax_money.set_ylabel("Argent (€)")
+        self.ax_money.set_title("Évolution de l'Argent", fontsize=14)
+        self.ax_money.set_xlabel("Nombre de parties", fontsize=12)
+        self.ax_money.set_ylabel("Argent (€)", fontsize=12)
+        self.ax_money.grid(True, linestyle='--', alpha=0.6)
+        self.money_line, = self.ax_money.plot([], [], color='blue', label='Argent')
 
         # Axe secondaire pour une autre métrique
         self.ax_secondary = self.ax_money.twinx()
         self.ax_secondary.set_ylabel("True Count")
+        self.true_count_line, = self.ax_secondary.plot([], [], color='orange', label='True Count')
 
         # Graphique pour les pourcentages de résultats
         self.ax_percentages = self.figure.add_subplot(212)
-        self.ax_percentages.set_title("Pourcentages de Résultats")
-        self.ax_percentages.set_xlabel("Nombre de parties")
-        self.ax_percentages.set_ylabel("Pourcentage (%)")
+        self.ax_percentages.set_title("Pourcentages de Résultats", fontsize=14)
+        self.ax_percentages.set_xlabel("Nombre de parties", fontsize=12)
+        self.ax_percentages.set_ylabel("Pourcentage (%)", fontsize=12)
+        self.ax_percentages.grid(True, linestyle='--', alpha=0.6)
+        self.percentage_lines = {result: self.ax_percentages.plot([], [], label=result, color=color)[0]
+                                 for result, color in self.RESULT_COLORS.items()}
+        self.ax_percentages.legend()
 
         # Intégration des graphes à l'interface Tkinter
         self.canvas = FigureCanvasTkAgg(self.figure, master=root)
-        self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.canvas.get_tk_widget().pack(fill='both', expand=True)
 
     def run_simulation(self):
         """ Lance la simulation dans un thread séparé pour ne pas bloquer l'interface graphique """
@@ -423,92 +1223,109 @@ class BlackjackGUI:
         self.simulator.player.money = int(self.initial_money_entry.get())
 
         # Réinitialiser les graphiques
-        self.ax_money.clear()
-        self.ax_money.set_title("Évolution de l'Argent", fontsize=14)
-        self.ax_money.set_xlabel("Nombre de parties", fontsize=12)
-        self.ax_money.set_ylabel("Argent (€)", fontsize=12)
-        self.ax_money.grid(True, linestyle='--', alpha=0.6)
-
-        self.ax_secondary.clear()
-        self.ax_secondary.set_ylabel("True Count")
+        for line in (self.money_line, self.true_count_line, *self.percentage_lines.values()):
+            line.set_data([], [])
+        self.canvas.draw_idle()
+        self.start_button.config(state='disabled')
 
-        self.ax_percentages.clear()
-        self.ax_percentages.set_title("Pourcentages de Résultats", fontsize=14)
-        self.ax_percentages.set_xlabel("Nombre de parties", fontsize=12)
-        self.ax_percentages.set_ylabel("Pourcentage (%)", fontsize=12)
-        self.ax_percentages.grid(True, linestyle='--', alpha=0.6)
-
-        self.canvas.draw()
-
-        # Lancer la simulation dans un thread séparé
+        # Lancer la simulation dans un thread séparé ; matplotlib n'est appelé que depuis la boucle Tk
         simulation_thread = threading.Thread(target=self.run_simulation_thread, daemon=True)
         simulation_thread.start()
+        self.root.after(self.REFRESH_MS, self.poll_updates)
 
     def run_simulation_thread(self):
-        """ Fonction exécutée en arrière-plan pour mettre à jour la simulation en temps réel """
-        self.simulator.results = []  # Réinitialiser les résultats
-        money_history = []
-        true_count_history = []
-        results_count = {'Player': 0, 'Dealer': 0, 'Surrender': 0, 'Push': 0}
-        percentages_history = {'Player': [], 'Dealer': [], 'Surrender': [], 'Push': []}
-
-        update_interval = max(1, self.simulator.num_games // 10)  # Mettre à jour moins fréquemment pour plus de fluidité
-
-        for i in range(self.simulator.num_games):
+        """ Fonction exécutée en arrière-plan : réduit les séries et envoie un instantané au plus tous les
+        REFRESH_MS millisecondes """
+        self.simulator.stats = SimulationStats(self.simulator.player.money)  # Réinitialiser les statistiques
+        money_series = MinMaxBuckets()
+        true_count_series = MinMaxBuckets()
+        results_count = dict.fromkeys(self.RESULT_COLORS, 0)
+        percentage_series = {result: MinMaxBuckets() for result in self.RESULT_COLORS}
+
+        next_update = 0.0
+        num_games = self.simulator.num_games
+        for i in range(num_games):
             self.simulator.play_game()  # Joue une partie
-            money_history.append(self.simulator.player.money)  # Enregistre l'évolution de l'argent
-            true_count_history.append(self.simulator.card_counter.true_count)  # Enregistre l'évolution du true count
+            money_series.append(self.simulator.player.money)  # Évolution de l'argent
+            true_count_series.append(self.simulator.card_counter.true_count)  # Évolution du true count
 
             # Mettre à jour les comptes de résultats
-            result = self.simulator.results[-1]['Result']
+            result = self.simulator.stats.last_result
             if result in results_count:
                 results_count[result] += 1
 
             # Calculer les pourcentages
             total_games_played = i + 1
-            for key in results_count:
-                percentages_history[key].append((results_count[key] / total_games_played) * 100)
-
-            # Mise à jour des graphiques à un intervalle défini
-            if i % update_interval == 0 or i == self.simulator.num_games - 1:
-                self.update_graphs(money_history, true_count_history, percentages_history)
-
-    def update_graphs(self, money_history, true_count_history, percentages_history):
-        """ Met à jour les graphiques en appelant Tkinter depuis le thread principal """
-        # Mettre à jour le graphique de l'argent
-        self.ax_money.clear()
-        sns.lineplot(x=range(1, len(money_history) + 1), y=money_history, ax=self.ax_money, color='blue', label='Argent')
-        self.ax_money.set_title("Évolution de l'Argent", fontsize=14)
-        self.ax_money.set_xlabel("Nombre de parties", fontsize=12)
-        self.ax_money.set_ylabel("Argent (€)", fontsize=12)
-        self.ax_money.grid(True, linestyle='--', alpha=0.6)
-
-        # Mettre à jour l'axe secondaire avec le true count
-        self.ax_secondary.clear()
-        sns.lineplot(x=range(1, len(true_count_history) + 1), y=true_count_history, ax=self.ax_secondary, color='orange', label='True Count')
-        self.ax_secondary.set_ylabel("True Count")
-
-        # Mettre à jour le graphique des pourcentages
-        self.ax_percentages.clear()
-        for key, color in zip(percentages_history.keys(), ['green', 'red', 'purple', 'orange']):
-            sns.lineplot(x=range(1, len(percentages_history[key]) + 1), y=percentages_history[key], ax=self.ax_percentages, label=key, color=color)
-        self.ax_percentages.set_title("Pourcentages de Résultats", fontsize=14)
-        self.ax_percentages.set_xlabel("Nombre de parties", fontsize=12)
-        self.ax_percentages.set_ylabel("Pourcentage (%)", fontsize=12)
-        self.ax_percentages.legend()
-        self.ax_percentages.grid(True, linestyle='--', alpha=0.6)
-
-        self.canvas.draw()
-        self.root.after(1, self.canvas.draw)  # Forcer le rafraîchissement graphique avec Tkinter
+            for key, series in percentage_series.items():
+                series.append((results_count[key] / total_games_played) * 100)
+
+            now = time.monotonic()
+            if now >= next_update or i == num_games - 1:
+                next_update = now + self.REFRESH_MS / 1000
+                self.updates.put({
+                    'money': money_series.points(),
+                    'true_count': true_count_series.points(),
+                    'percentages': {key: series.points() for key, series in percentage_series.items()},
+                    'done': i == num_games - 1,
+                })
+        if not num_games:
+            self.updates.put({'done': True})
+
+    def poll_updates(self):
+        """ Boucle Tk : applique le dernier instantané reçu, puis se reprogramme tant que la simulation tourne """
+        snapshot = None
+        while True:
+            try:
+                snapshot = self.updates.get_nowait()
+            except queue.Empty:
+                break
+        if snapshot is not None and 'money' in snapshot:
+            self.update_graphs(snapshot)
+        if snapshot is not None and snapshot['done']:
+            self.start_button.config(state='normal')
+        else:
+            self.root.after(self.REFRESH_MS, self.poll_updates)
+
+    def update_graphs(self, snapshot):
+        """ Remplace les données des courbes existantes (nombre de points constant) et redessine """
+        self.money_line.set_data(*snapshot['money'])
+        self.true_count_line.set_data(*snapshot['true_count'])
+        for key, points in snapshot['percentages'].items():
+            self.percentage_lines[key].set_data(*points)
+        for ax in (self.ax_money, self.ax_secondary, self.ax_percentages):
+            ax.relim()
+            ax.autoscale_view()
+        self.canvas.draw_idle()
+
+def run_gui(simulator):
+    """ Lance l'interface graphique (tkinter et matplotlib sont importés ici) """
+    import tkinter as tk
 
-# Lancement de l'interface graphique
-if __name__ == "__main__":
     root = tk.Tk()
-    simulator = BlackjackSimulator(
-        "card_count_values.csv", "betting_system.csv", "strategy_Ace.csv",
-        "strategy_Pair.csv", "strategy_Hard.csv", num_decks=6, penetration=0.75,
-        num_games=200  # Valeur par défaut, sera remplacée par l'entrée utilisateur
-    )
     app = BlackjackGUI(root, simulator)
     root.mainloop()
+    return app
 
+
+if __name__ == "__main__":
+    gui = '--gui' in sys.argv[1:]
+    arguments = [argument for argument in sys.argv[1:] if argument != '--gui']
+    if len(arguments) not in (5, 6) and not (gui and not arguments):
+        print(
+            "Usage: python blackjack_simulatorV7.py card_count_values.csv betting_system.csv strategy_Ace.csv strategy_Pair.csv strategy_Hard.csv [strategy_Deviations.csv] [--gui]")
+        sys.exit(1)
+    files = arguments or ["card_count_values.csv", "betting_system.csv", "strategy_Ace.csv", "strategy_Pair.csv",
+                          "strategy_Hard.csv"]
+    deviation_file = files[5] if len(files) == 6 else None
+
+    if gui:
+        # Lancement de l'interface graphique
+        simulator = BlackjackSimulator(
+            *files[:5], num_decks=6, penetration=0.75,
+            num_games=200,  # Valeur par défaut, sera remplacée par l'entrée utilisateur
+            deviation_file=deviation_file
+        )
+        run_gui(simulator)
+    else:
+        simulator = BlackjackSimulator(*files[:5], num_games=10, verbose=True, deviation_file=deviation_file)
+        simulator.simulate()
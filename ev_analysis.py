@@ -0,0 +1,266 @@
+import sys
+
+from blackjack_simulatorV7 import (ACE_RANK, CARD_VALUES, DOUBLE, HIT, RANK_POINTS, SPLIT, STAND, SURRENDER_HIT,
+                                   SURRENDER_STAND, StrategyManager)
+
+# Classes de points utilisées après les deux premières cartes : 0 = As, 1..9 = 2..10
+POINT_CLASSES = 10
+CLASS_POINTS = (1, 2, 3, 4, 5, 6, 7, 8, 9, 10)
+RANK_CLASS = tuple(0 if rank == ACE_RANK else RANK_POINTS[rank] - 1 for rank in range(len(CARD_VALUES)))
+TEN_CLASS = 9
+# Issues du croupier : 17, 18, 19, 20, 21, bust
+DEALER_OUTCOMES = 6
+BUST = 5
+
+
+def _remove(composition, index):
+    composition = list(composition)
+    composition[index] -= 1
+    return tuple(composition)
+
+
+def _hand_value(total, aces):
+    return total + 10 if aces and total + 10 <= 21 else total
+
+
+class ApproximateEVCalculator:
+    """ Espérance (par unité misée) d'une table de StrategyManager pour une composition de sabot, sans simulation
+    ni variance, mais approchée : sabot infini après la donne
+
+    Règles par défaut de BlackjackSimulator (HouseRules()) : pas de peek, croupier reste sur 17 souple, blackjack payé 3:2 même
+    contre un blackjack du croupier, surrender et double sur la première décision de chaque main (splits
+    compris), splits illimités ; l'abandon perd toute la mise contre un blackjack du croupier.
+
+    Seule la donne initiale (deux cartes du joueur, carte visible) est tirée sans remise dans la composition.
+    Toutes les cartes suivantes du joueur et du croupier sont ensuite tirées avec remise dans une composition
+    fixe : celle qui reste après la donne avec card_removal=True, celle d'origine avec card_removal=False
+    (beaucoup plus rapide, pour classer des variantes). Les cartes sorties pendant la main ne sont donc pas
+    retirées, et les mains issues d'un split sont supposées indépendantes : l'écart avec l'espérance exacte
+    dépendant de la composition grandit quand le nombre de jeux diminue.
+
+    true_count fixe le compte utilisé pour les index plays de strategy_manager (None : stratégie de base). """
+
+    def __init__(self, strategy_manager, num_decks=6, composition=None, card_removal=True, true_count=None):
+        self.strategy_manager = strategy_manager
+        self.card_removal = card_removal
+        self.true_count = true_count
+        # Nombre de cartes par rang, dans l'ordre de CARD_VALUES
+        self.composition = tuple(composition) if composition else (4 * num_decks,) * len(CARD_VALUES)
+        tens = sum(count for rank, count in enumerate(self.composition) if RANK_CLASS[rank] == TEN_CLASS)
+        # Part de chaque rang à 10 points, pour la probabilité de tirer le même rang après un split
+        self._ten_share = [count / tens if tens and RANK_CLASS[rank] == TEN_CLASS else 1.0
+                           for rank, count in enumerate(self.composition)]
+        self._probability_cache = {}
+        self._dealer_cache = {}
+        # Par rang visible du croupier : état de la main -> (espérance, cases de stratégie consultées)
+        self._player_cache = [{} for _ in CARD_VALUES]
+        self._upcard_cache = {}
+
+    def clear_strategy_cache(self):
+        """ À appeler après une modification de la stratégie ; les distributions du croupier restent valables """
+        for cache in self._player_cache:
+            cache.clear()
+        self._upcard_cache.clear()
+
+    def invalidate(self, slots, upcard_rank):
+        """ Oublie les résultats qui dépendent des cases compilées slots contre ce rang visible
+
+        Renvoie de quoi annuler l'opération avec restore() si la modification est abandonnée. """
+        slots = set(slots)
+        cache = self._player_cache[upcard_rank]
+        removed = {key: entry for key, entry in cache.items() if not slots.isdisjoint(entry[1])}
+        for key in removed:
+            del cache[key]
+        return slots, removed, self._upcard_cache.pop(upcard_rank, None)
+
+    def restore(self, invalidated, upcard_rank):
+        """ Revient à l'état d'avant invalidate(), une fois la case remise à son ancienne action """
+        slots, removed, upcard_ev = invalidated
+        cache = self._player_cache[upcard_rank]
+        for key in [key for key, entry in cache.items() if not slots.isdisjoint(entry[1])]:
+            del cache[key]
+        cache.update(removed)
+        if upcard_ev is not None:
+            self._upcard_cache[upcard_rank] = upcard_ev
+
+    def _classes(self, composition):
+        classes = [0] * POINT_CLASSES
+        for rank, count in enumerate(composition):
+            classes[RANK_CLASS[rank]] += count
+        return tuple(classes)
+
+    def dealer_distribution(self, composition, upcard_class):
+        """ Probabilités des totaux finaux du croupier (17..21, bust) ; composition en classes de points """
+        key = (composition, upcard_class)
+        distribution = self._dealer_cache.get(key)
+        if distribution is None:
+            distribution = self._dealer(self._draw_probabilities(composition), CLASS_POINTS[upcard_class],
+                                        upcard_class == 0, {})
+            self._dealer_cache[key] = distribution
+        return distribution
+
+    def _dealer(self, probabilities, total, aces, memo):
+        value = _hand_value(total, aces)
+        if value >= 17:
+            outcome = [0.0] * DEALER_OUTCOMES
+            outcome[BUST if value > 21 else value - 17] = 1.0
+            return outcome
+        key = (total, aces)
+        cached = memo.get(key)
+        if cached is not None:
+            return cached
+
+        distribution = [0.0] * DEALER_OUTCOMES
+        for card_class, probability in probabilities:
+            outcome = self._dealer(probabilities, total + CLASS_POINTS[card_class], aces or card_class == 0, memo)
+            for index in range(DEALER_OUTCOMES):
+                distribution[index] += probability * outcome[index]
+        memo[key] = distribution
+        return distribution
+
+    def _stand_ev(self, composition, value, upcard_class):
+        distribution = self.dealer_distribution(composition, upcard_class)
+        ev = distribution[BUST]
+        for index in range(BUST):
+            dealer_value = 17 + index
+            if value > dealer_value:
+                ev += distribution[index]
+            elif value < dealer_value:
+                ev -= distribution[index]
+        return ev
+
+    def _dealer_blackjack_probability(self, composition, upcard_class):
+        """ Probabilité que la carte cachée complète un blackjack (composition en classes de points) """
+        if upcard_class == 0:
+            hole_class = TEN_CLASS
+        elif upcard_class == TEN_CLASS:
+            hole_class = 0
+        else:
+            return 0.0
+        return composition[hole_class] / sum(composition)
+
+    def _draw_probabilities(self, composition):
+        """ [(classe, probabilité)] pour une composition en classes de points """
+        probabilities = self._probability_cache.get(composition)
+        if probabilities is None:
+            remaining = sum(composition)
+            probabilities = [(card_class, count / remaining) for card_class, count in enumerate(composition) if count]
+            self._probability_cache[composition] = probabilities
+        return probabilities
+
+    def _player_ev(self, composition, other, aces, first, pair_rank, upcard_rank):
+        """ (espérance, cases de stratégie consultées dans tout le sous-arbre) """
+        cache = self._player_cache[upcard_rank]
+        key = (composition, other, aces, first, pair_rank)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+
+        upcard_class = RANK_CLASS[upcard_rank]
+        action = self.strategy_manager.lookup(pair_rank, aces > 0, other, upcard_rank, self.true_count)
+        slots = {self.strategy_manager.slot(pair_rank, aces > 0, other)}
+        if not first:
+            if action == SURRENDER_HIT or action == DOUBLE:
+                action = HIT
+            elif action == SURRENDER_STAND:
+                action = STAND
+        if action == SPLIT and pair_rank < 0:
+            action = HIT
+
+        if action == STAND:
+            ev = self._stand_ev(composition, _hand_value(other + aces, aces), upcard_class)
+        elif action == SURRENDER_HIT or action == SURRENDER_STAND:
+            ev = -0.5 - 0.5 * self._dealer_blackjack_probability(composition, upcard_class)
+        elif action == SPLIT:
+            ev, split_slots = self._split_hand_ev(composition, pair_rank, upcard_rank)
+            ev *= 2
+            slots |= split_slots
+        else:
+            ev = 0.0
+            for card_class, probability in self._draw_probabilities(composition):
+                new_other = other + (CLASS_POINTS[card_class] if card_class else 0)
+                new_aces = aces + (card_class == 0)
+                value = _hand_value(new_other + new_aces, new_aces)
+                if value > 21:
+                    ev -= probability
+                elif action == DOUBLE:
+                    ev += probability * self._stand_ev(composition, value, upcard_class)
+                else:
+                    hit_ev, hit_slots = self._player_ev(composition, new_other, new_aces, False, -1, upcard_rank)
+                    ev += probability * hit_ev
+                    slots |= hit_slots
+            if action == DOUBLE:
+                ev *= 2
+        entry = cache[key] = (ev, frozenset(slots))
+        return entry
+
+    def _split_hand_ev(self, composition, pair_rank, upcard_rank):
+        """ Une main issue d'un split : la carte pair_rank plus une carte tirée, décisions complètes
+
+        Tirer à nouveau le même rang redonne la paire de départ, donc un nouveau split (resplits illimités) :
+        E = autres + 2 * p(même rang) * E, d'où E = autres / (1 - 2 * p(même rang)). """
+        pair_class = RANK_CLASS[pair_rank]
+        pair_points = 0 if pair_class == 0 else CLASS_POINTS[pair_class]
+        others, same_rank = 0.0, 0.0
+        slots = set()
+        for card_class, probability in self._draw_probabilities(composition):
+            other = pair_points + (CLASS_POINTS[card_class] if card_class else 0)
+            aces = (pair_class == 0) + (card_class == 0)
+            if card_class == pair_class:
+                same_rank += probability * self._ten_share[pair_rank]
+                probability *= 1 - self._ten_share[pair_rank]
+                if not probability:
+                    continue
+            hand_ev, hand_slots = self._player_ev(composition, other, aces, True, -1, upcard_rank)
+            others += probability * hand_ev
+            slots |= hand_slots
+        if 2 * same_rank >= 1:
+            raise ValueError(f"Unlimited resplits of {CARD_VALUES[pair_rank]} diverge for this composition")
+        return others / (1 - 2 * same_rank), slots
+
+    def upcard_ev(self, upcard_rank):
+        """ Espérance conditionnelle à la carte visible du croupier """
+        ev = self._upcard_cache.get(upcard_rank)
+        if ev is not None:
+            return ev
+
+        composition = _remove(self.composition, upcard_rank)
+        remaining = sum(composition)
+        shoe_classes = self._classes(self.composition)
+        ev = 0.0
+        for first_rank, first_count in enumerate(composition):
+            if not first_count:
+                continue
+            after_first = _remove(composition, first_rank)
+            for second_rank, second_count in enumerate(after_first):
+                if not second_count:
+                    continue
+                probability = first_count / remaining * second_count / (remaining - 1)
+                ranks = (first_rank, second_rank)
+                aces = ranks.count(ACE_RANK)
+                other = sum(RANK_POINTS[rank] for rank in ranks if rank != ACE_RANK)
+                if aces == 1 and other == 10:
+                    ev += probability * 1.5
+                    continue
+                pair_rank = first_rank if first_rank == second_rank else -1
+                hand_composition = (self._classes(_remove(after_first, second_rank)) if self.card_removal
+                                    else shoe_classes)
+                ev += probability * self._player_ev(hand_composition, other, aces, True, pair_rank, upcard_rank)[0]
+        self._upcard_cache[upcard_rank] = ev
+        return ev
+
+    def expected_value(self):
+        total = sum(self.composition)
+        return sum(count / total * self.upcard_ev(rank) for rank, count in enumerate(self.composition) if count)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (4, 5):
+        print("Usage: python ev_analysis.py strategy_Ace.csv strategy_Pair.csv strategy_Hard.csv [num_decks]")
+        sys.exit(1)
+
+    strategy_manager = StrategyManager(sys.argv[2], sys.argv[1], sys.argv[3])
+    calculator = ApproximateEVCalculator(strategy_manager, num_decks=int(sys.argv[4]) if len(sys.argv) == 5 else 6)
+    for rank, value in enumerate(CARD_VALUES):
+        print(f"Dealer {value}: {calculator.upcard_ev(rank) * 100:+.3f}%")
+    print(f"Expected value (infinite shoe after the deal): {calculator.expected_value() * 100:+.3f}% per initial bet")
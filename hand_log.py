@@ -0,0 +1,181 @@
+import os
+import struct
+import sys
+from array import array
+
+from blackjack_simulatorV7 import ACTION_CODES, ACTIONS, CARD_VALUES, SimulationStats
+
+MAGIC = b'BJHL'
+VERSION = 2
+HEADER = struct.Struct('<4sHH8x')  # magic, version, nombre de colonnes
+HEADER_FILE = 'header'
+MAX_CARDS = 12
+MAX_ACTIONS = 16
+NO_CARD = 255
+
+RESULTS = SimulationStats.RESULTS
+RESULT_CODES = {result: code for code, result in enumerate(RESULTS)}
+
+# Une colonne par champ, chacune dans son propre fichier <nom>.col (little-endian) :
+# (nom, dtype NumPy, code du module array, valeurs par main)
+FIELDS = (
+    ('bet', '<f8', 'd', 1),
+    ('money', '<f8', 'd', 1),
+    ('true_count', '<f4', 'f', 1),
+    ('running_count', '<f4', 'f', 1),
+    ('remaining_cards', '<u2', 'H', 1),
+    ('result', 'u1', 'B', 1),
+    ('player_total', 'u1', 'B', 1),
+    ('dealer_total', 'u1', 'B', 1),
+    ('num_player_cards', 'u1', 'B', 1),
+    ('num_dealer_cards', 'u1', 'B', 1),
+    ('num_actions', 'u1', 'B', 1),
+    ('player_cards', 'u1', 'B', MAX_CARDS),
+    ('dealer_cards', 'u1', 'B', MAX_CARDS),
+    ('actions', 'u1', 'B', MAX_ACTIONS),
+)
+
+
+def column_path(directory, name):
+    return os.path.join(directory, name + '.col')
+
+
+def _pack_codes(codes, width):
+    return bytes(codes[:width]) + bytes([NO_CARD]) * (width - min(len(codes), width))
+
+
+class HandLogWriter:
+    """ Sink binaire pour simulator.sinks : journal en colonnes, un fichier de taille fixe par champ dans le
+    répertoire directory, complété par paquets de chunk_size mains
+
+    Lire une colonne ne touche que son fichier (reader['true_count'] lit 4 octets par main). Les mains de plus
+    de MAX_CARDS cartes (ou MAX_ACTIONS actions) sont tronquées, les compteurs gardent la vraie longueur. """
+
+    def __init__(self, directory, chunk_size=65536):
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, HEADER_FILE), 'wb') as file:
+            file.write(HEADER.pack(MAGIC, VERSION, len(FIELDS)))
+        self.files = [open(column_path(directory, name), 'wb') for name, _, _, _ in FIELDS]
+        self.buffers = [array(code) for _, _, code, _ in FIELDS]
+        self.chunk_size = chunk_size
+        self.pending = 0
+
+    def write(self, simulator, result, player_actions, dealer_actions, hand_index):
+        player_hand = simulator.player.hands[hand_index]
+        dealer_hand = simulator.dealer.hands[0]
+        (bets, money, true_counts, running_counts, remaining_cards, results, player_totals, dealer_totals,
+         num_player_cards, num_dealer_cards, num_actions, player_cards, dealer_cards, actions) = self.buffers
+        bets.append(simulator.player.bets[hand_index])
+        money.append(simulator.player.money)
+        true_counts.append(simulator.card_counter.true_count)
+        running_counts.append(simulator.card_counter.running_count)
+        remaining_cards.append(simulator.deck.remaining)
+        results.append(RESULT_CODES[result])
+        player_totals.append(min(simulator.player.hand_value(hand_index), 255))
+        dealer_totals.append(min(simulator.dealer.hand_value(), 255))
+        num_player_cards.append(min(len(player_hand), 255))
+        num_dealer_cards.append(min(len(dealer_hand), 255))
+        num_actions.append(min(len(player_actions), 255))
+        player_cards.frombytes(_pack_codes([card.rank for card in player_hand], MAX_CARDS))
+        dealer_cards.frombytes(_pack_codes([card.rank for card in dealer_hand], MAX_CARDS))
+        actions.frombytes(_pack_codes([ACTION_CODES[action] for action in player_actions], MAX_ACTIONS))
+        self.pending += 1
+        if self.pending == self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        for file, buffer in zip(self.files, self.buffers):
+            if sys.byteorder == 'big':
+                buffer.byteswap()
+            buffer.tofile(file)
+            del buffer[:]
+            file.flush()
+        self.pending = 0
+
+    def close(self):
+        if not self.files[0].closed:
+            self.flush()
+            for file in self.files:
+                file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class HandLogReader:
+    """ Ouvre un journal en colonnes ; reader['money'] est une vue NumPy mappée sur le seul fichier de la colonne,
+    sans copie """
+
+    def __init__(self, directory):
+        import numpy as np
+
+        with open(os.path.join(directory, HEADER_FILE), 'rb') as file:
+            magic, version, num_columns = HEADER.unpack(file.read(HEADER.size))
+        if magic != MAGIC or version != VERSION or num_columns != len(FIELDS):
+            raise ValueError(f"{directory} is not a version {VERSION} hand log")
+        self.columns = {}
+        lengths = set()
+        for name, dtype, _, width in FIELDS:
+            path = column_path(directory, name)
+            row_size = np.dtype(dtype).itemsize * width
+            length = os.path.getsize(path) // row_size
+            shape = (length, width) if width > 1 else (length,)
+            if length == 0:
+                self.columns[name] = np.zeros(shape, dtype=dtype)  # mmap refuse une zone vide
+            else:
+                self.columns[name] = np.memmap(path, dtype=dtype, mode='r', shape=shape)
+            lengths.add(length)
+        if len(lengths) != 1:
+            raise ValueError(f"{directory} has columns of different lengths")
+        self.length = lengths.pop()
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, column):
+        return self.columns[column]
+
+    def result_mask(self, result):
+        return self.columns['result'] == RESULT_CODES[result]
+
+    def true_count_mask(self, low=None, high=None):
+        import numpy as np
+
+        true_counts = self.columns['true_count']
+        mask = np.ones(len(true_counts), dtype=bool)
+        if low is not None:
+            mask &= true_counts >= low
+        if high is not None:
+            mask &= true_counts < high
+        return mask
+
+    def hand(self, index):
+        """ Décode une main dans le format de HandHistory """
+        columns = self.columns
+        return {
+            'Bet': float(columns['bet'][index]),
+            'Player Hand': [CARD_VALUES[rank] for rank in columns['player_cards'][index] if rank != NO_CARD],
+            'Player Total': int(columns['player_total'][index]),
+            'Dealer Hand': [CARD_VALUES[rank] for rank in columns['dealer_cards'][index] if rank != NO_CARD],
+            'Dealer Total': int(columns['dealer_total'][index]),
+            'Result': RESULTS[columns['result'][index]],
+            'Player Money': float(columns['money'][index]),
+            'Running Count': float(columns['running_count'][index]),
+            'True Count': f"{columns['true_count'][index]:.2f}",
+            'Remaining Cards': int(columns['remaining_cards'][index]),
+            'Player Actions': [ACTIONS[code] for code in columns['actions'][index] if code != NO_CARD],
+        }
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python hand_log.py hands.bjl")
+        sys.exit(1)
+
+    reader = HandLogReader(sys.argv[1])
+    print(f"Hands logged: {len(reader)}")
+    for result in RESULTS:
+        print(f"{result}: {int(reader.result_mask(result).sum())}")
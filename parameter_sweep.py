@@ -0,0 +1,67 @@
+import csv
+import itertools
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from blackjack_simulatorV7 import BlackjackSimulator, SimulationStats
+
+COLUMNS = ('Decks', 'Penetration', 'Betting', 'Strategy', 'Games') + SimulationStats.RESULTS + (
+    'Final Money', 'Highest Money', 'Lowest Money', 'EV per Round', 'SD per Round')
+
+
+def _run_config(job):
+    count_values_file, num_games, seed, num_decks, penetration, betting_file, strategy_dir = job
+    simulator = BlackjackSimulator(count_values_file, betting_file,
+                                   os.path.join(strategy_dir, 'strategy_Ace.csv'),
+                                   os.path.join(strategy_dir, 'strategy_Pair.csv'),
+                                   os.path.join(strategy_dir, 'strategy_Hard.csv'),
+                                   num_decks=num_decks, penetration=penetration, initial_money=0,
+                                   num_games=num_games, seed=seed, shuffle='replay')
+    simulator.run()
+    row = {'Decks': num_decks, 'Penetration': penetration, 'Betting': betting_file, 'Strategy': strategy_dir,
+           'Games': num_games}
+    row.update(simulator.stats.summary())
+    return row
+
+
+def sweep(count_values_file, num_games, decks, penetrations, betting_files, strategy_dirs, seed=0, workers=None):
+    """ Joue toutes les combinaisons de la grille, réparties entre les processus
+
+    Toutes les configurations jouent les mêmes sabots pour un même nombre de jeux (nombres aléatoires communs) :
+    le sabot n est toujours mélangé avec derive_seed(seed, n) (ReplayShuffle), rien n'est gardé en mémoire. Les
+    écarts entre lignes viennent des paramètres, pas du hasard des cartes. """
+    jobs = [(count_values_file, num_games, seed, num_decks, penetration, betting_file, strategy_dir)
+            for num_decks, penetration, betting_file, strategy_dir
+            in itertools.product(decks, penetrations, betting_files, strategy_dirs)]
+    workers = min(workers or os.cpu_count(), len(jobs))
+    if workers <= 1:
+        return [_run_config(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_run_config, jobs, chunksize=max(1, len(jobs) // (4 * workers))))
+
+
+def write_results(filepath, rows):
+    with open(filepath, 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=COLUMNS, delimiter=';')
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (8, 9):
+        print("Usage: python parameter_sweep.py card_count_values.csv num_games results.csv decks penetrations "
+              "betting_files strategy_dirs [seed]\n"
+              "  lists are comma separated, e.g. 1,6,8 0.5,0.75 betting_system.csv .,\"Strategy/Basic Strategy ENHC\"")
+        sys.exit(1)
+
+    rows = sweep(sys.argv[1], int(sys.argv[2]),
+                 [int(value) for value in sys.argv[4].split(',')],
+                 [float(value) for value in sys.argv[5].split(',')],
+                 sys.argv[6].split(','), sys.argv[7].split(','),
+                 seed=int(sys.argv[8]) if len(sys.argv) == 9 else 0)
+    write_results(sys.argv[3], rows)
+    for row in rows:
+        print(f"{row['Decks']} decks, penetration {row['Penetration']}, {row['Betting']}, {row['Strategy']}: "
+              f"EV per game {row['EV per Round']:.4f} (SD {row['SD per Round']:.4f})")
+    print(f"{len(rows)} configurations written to {sys.argv[3]}")
@@ -0,0 +1,131 @@
+import hashlib
+import os
+import pickle
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from blackjack_simulatorV7 import BlackjackSimulator, SimulationStats, _simulate_worker, derive_seed, print_summary
+
+
+# À augmenter quand le simulateur change de résultats pour une même configuration (entrées plus anciennes ignorées)
+CACHE_VERSION = 2
+
+
+class ResultCache:
+    """ Cache disque des statistiques agrégées, une entrée par contenu chargé (stratégie, mises, comptage),
+    paramètres et graine
+
+    Une exécution de num_games parties est découpée en paquets de chunk_size parties, le paquet i étant joué avec
+    la graine derive_seed(seed, i) puis enchaîné avec SimulationStats.merge. Les paquets déjà joués sont gardés :
+    une exécution plus longue ne joue que les paquets manquants. Les entrées les moins récemment utilisées sont
+    supprimées au-delà de max_entries fichiers ou de max_bytes octets. """
+
+    def __init__(self, directory='.blackjack_cache', max_entries=256, max_bytes=64 * 2 ** 20, chunk_size=10000):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, simulator):
+        """ Empreinte du contenu chargé (pas des noms de fichiers) et des paramètres qui changent le résultat """
+        if simulator.seed is None:
+            raise ValueError("Only seeded simulators can be cached")
+        if not isinstance(simulator.config['shuffle'], str):
+            raise ValueError("Only named shuffle models can be cached")
+        strategy_manager = simulator.strategy_manager
+        content = (
+            CACHE_VERSION,
+            strategy_manager.hard_table, strategy_manager.soft_table, strategy_manager.pair_table,
+            strategy_manager.hard_deviations, strategy_manager.soft_deviations, strategy_manager.pair_deviations,
+            sorted((int(true_count), float(bet))
+                   for true_count, bet in simulator.betting_system.betting_strategy.items()),
+            simulator.card_counter.tags,
+            [(counter.name, counter.tags) for counter in simulator.shadow_counters],
+            simulator.num_decks, simulator.penetration, simulator.base_bet, simulator.initial_money,
+            simulator.config['shuffle'], repr(simulator.rules), simulator.seed, self.chunk_size,
+        )
+        return hashlib.sha256(repr(content).encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.pkl')
+
+    def _load(self, key):
+        try:
+            with open(self._path(key), 'rb') as file:
+                entry = pickle.load(file)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return {'chunks': [], 'partial': None}
+        os.utime(self._path(key))  # dernière utilisation, pour l'éviction LRU
+        return entry
+
+    def _store(self, key, entry):
+        path = self._path(key)
+        with open(path + '.tmp', 'wb') as file:
+            pickle.dump(entry, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + '.tmp', path)
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.pkl'):
+                stat = os.stat(os.path.join(self.directory, name))
+                entries.append((stat.st_mtime, stat.st_size, name))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        while entries and (len(entries) > self.max_entries or total > self.max_bytes):
+            _, size, name = entries.pop(0)
+            os.remove(os.path.join(self.directory, name))
+            total -= size
+
+    def run(self, simulator, num_games=None, workers=1):
+        """ Statistiques de num_games parties (simulator.num_games par défaut) ; renvoie (stats, parties jouées) """
+        num_games = simulator.num_games if num_games is None else num_games
+        key = self.key(simulator)
+        entry = self._load(key)
+        full_chunks, rest = divmod(num_games, self.chunk_size)
+
+        jobs = [(simulator.config, self.chunk_size, derive_seed(simulator.seed, index), False)
+                for index in range(len(entry['chunks']), full_chunks)]
+        partial = entry['partial']
+        cached_rest = partial is not None and partial[:2] == (full_chunks, rest)
+        if rest and not cached_rest:
+            jobs.append((simulator.config, rest, derive_seed(simulator.seed, full_chunks), False))
+        if workers > 1 and len(jobs) > 1:
+            with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as executor:
+                outcomes = [outcome[0] for outcome in executor.map(_simulate_worker, jobs)]
+        else:
+            outcomes = [_simulate_worker(job)[0] for job in jobs]
+
+        rest_stats = None
+        if rest:
+            rest_stats = partial[2] if cached_rest else outcomes.pop()
+        if jobs:
+            entry['chunks'].extend(outcomes)
+            # Un paquet partiel n'est gardé que s'il est le prochain paquet à compléter
+            if rest and not cached_rest and full_chunks == len(entry['chunks']):
+                entry['partial'] = (full_chunks, rest, rest_stats)
+            elif partial is not None and partial[0] < len(entry['chunks']):
+                entry['partial'] = None
+            self._store(key, entry)
+
+        stats = SimulationStats(simulator.initial_money)
+        for chunk_stats in entry['chunks'][:full_chunks]:
+            stats.merge(chunk_stats)
+        if rest_stats is not None:
+            stats.merge(rest_stats)
+        return stats, sum(job[1] for job in jobs)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (7, 8):
+        print("Usage: python result_cache.py card_count_values.csv betting_system.csv strategy_Ace.csv "
+              "strategy_Pair.csv strategy_Hard.csv num_games [seed]")
+        sys.exit(1)
+
+    simulator = BlackjackSimulator(*sys.argv[1:6], num_games=int(sys.argv[6]),
+                                   seed=int(sys.argv[7]) if len(sys.argv) == 8 else 0)
+    stats, played = ResultCache().run(simulator, workers=os.cpu_count())
+    print_summary(stats.summary())
+    print(f"Games simulated: {played} ({simulator.num_games - played} from cache)")
@@ -0,0 +1,162 @@
+import math
+import sys
+
+import numpy as np
+
+from blackjack_simulatorV7 import BettingSystem, BlackjackSimulator
+
+DRAWDOWN_QUANTILES = (0.5, 0.9, 0.95, 0.99)
+# Nombre de tirages par bloc (chemins x parties) pour borner la mémoire
+BLOCK_SAMPLES = 2 ** 22
+# Un true count réel dépasse très rarement ±20, même à un seul jeu : au-delà, le comptage a dérivé
+TRUE_COUNT_BOUND = 20
+MAX_OUT_OF_BOUND_SHARE = 0.001
+
+
+def check_true_counts(stats, bound=TRUE_COUNT_BOUND, max_share=MAX_OUT_OF_BOUND_SHARE):
+    """ Vérifie que les true counts enregistrés restent dans [-bound, bound], à max_share des parties près
+
+    Un running count qui n'est pas remis à zéro à chaque mélange dérive d'un sabot à l'autre et remplit
+    l'histogramme de true counts impossibles. """
+    rounds = sum(tally[0] for tally in stats.true_counts.values())
+    out_of_bound = sum(tally[0] for true_count, tally in stats.true_counts.items() if abs(true_count) > bound)
+    if rounds and out_of_bound > max_share * rounds:
+        raise ValueError(f"{out_of_bound / rounds:.2%} of rounds recorded a true count beyond ±{bound} "
+                         f"(extremes {min(stats.true_counts)} and {max(stats.true_counts)}); "
+                         "is the running count reset at each shuffle?")
+
+
+class RiskAnalysis:
+    """ Risque de ruine et variance d'un écart de mises, à partir de la distribution des issues par true count
+
+    stats.outcomes donne, pour chaque true count, la distribution du gain net en unités de mise initiale ; elle
+    ne dépend que de la stratégie et du comptage. Chaque partie d'un chemin de bankroll est tirée au hasard
+    dans cette distribution (true count et issue ensemble) puis multipliée par la mise de betting_system pour
+    ce true count : les parties sont supposées indépendantes. Les parties jouées sans mise (bet 0, absentes de
+    stats.outcomes) restent des parties au gain et à la mise nuls, quelle que soit la mise de betting_system pour
+    leur true count. Les true counts enregistrés sont d'abord contrôlés
+    par check_true_counts ; true_count_bound=None désactive ce contrôle (comptage déséquilibré comme KO, dont le
+    running count sert de true count). """
+
+    def __init__(self, stats, betting_system, true_count_bound=TRUE_COUNT_BOUND):
+        if true_count_bound is not None:
+            check_true_counts(stats, true_count_bound)
+        outcomes = sorted(stats.outcomes.items())
+        played = {}
+        for (true_count, _), count in outcomes:
+            played[true_count] = played.get(true_count, 0) + count
+        sat_out = [(true_count, tally[0] - played.get(true_count, 0))
+                   for true_count, tally in sorted(stats.true_counts.items()) if tally[0] > played.get(true_count, 0)]
+        if not outcomes and not sat_out:
+            raise ValueError("No rounds recorded")
+        counts = np.array([count for _, count in outcomes] + [count for _, count in sat_out], dtype=float)
+        self.true_counts = np.array([true_count for (true_count, _), _ in outcomes] +
+                                    [true_count for true_count, _ in sat_out], dtype=int)
+        self.units = np.array([units for (_, units), _ in outcomes] + [0.0] * len(sat_out))
+        self.probabilities = counts / counts.sum()
+        self.bets = np.array([betting_system.get_bet(true_count) for (true_count, _), _ in outcomes] +
+                             [0.0] * len(sat_out), dtype=float)
+        self.nets = self.bets * self.units
+        # Les chemins ne dépendent que du gain : une catégorie par gain distinct, beaucoup moins nombreuses
+        self._net_values, inverse = np.unique(self.nets, return_inverse=True)
+        self._cumulative = np.cumsum(np.bincount(inverse, weights=self.probabilities))
+        self._cumulative[-1] = 1.0
+
+        self.mean = float(self.probabilities @ self.nets)
+        self.sd = math.sqrt(max(float(self.probabilities @ self.nets ** 2) - self.mean ** 2, 0.0))
+        self.average_bet = float(self.probabilities @ self.bets)
+
+    @property
+    def n0(self):
+        """ Parties nécessaires pour que l'espérance égale un écart-type """
+        return self.sd ** 2 / self.mean ** 2 if self.mean else math.inf
+
+    @property
+    def score(self):
+        """ SCORE = 1 000 000 / N0 """
+        return 1e6 / self.n0
+
+    def analytic_risk_of_ruin(self, bankroll):
+        """ Approximation sur un horizon infini : exp(-2 * espérance * bankroll / variance) """
+        if self.mean <= 0:
+            return 1.0
+        return math.exp(-2 * self.mean * bankroll / self.sd ** 2)
+
+    def table(self):
+        """ {true count: (fréquence, espérance par unité, mise)} """
+        table = {}
+        for true_count in np.unique(self.true_counts):
+            mask = self.true_counts == true_count
+            frequency = float(self.probabilities[mask].sum())
+            # Mise des parties jouées ; 0 si toutes les parties de ce true count étaient sans mise
+            table[int(true_count)] = (frequency, float(self.probabilities[mask] @ self.units[mask]) / frequency,
+                                      float(self.bets[mask].max()))
+        return table
+
+    def simulate(self, bankroll, rounds, paths=1000000, seed=None):
+        """ Ré-échantillonne paths chemins de rounds parties ; la ruine est une bankroll à 0 ou moins
+
+        Les chemins sont traités par blocs de parties (vectorisés sur tous les chemins du bloc). """
+        rng = np.random.default_rng(seed)
+        ruined = 0
+        drawdowns = np.empty(paths)
+        finals = np.empty(paths)
+        path_block = max(1, min(paths, BLOCK_SAMPLES // max(1, min(rounds, 256))))
+        for first_path in range(0, paths, path_block):
+            count = min(path_block, paths - first_path)
+            money = np.full(count, float(bankroll))
+            peak = money.copy()
+            drawdown = np.zeros(count)
+            lowest = money.copy()
+            round_block = max(1, BLOCK_SAMPLES // count)
+            for first_round in range(0, rounds, round_block):
+                steps = min(round_block, rounds - first_round)
+                indices = np.searchsorted(self._cumulative, rng.random((count, steps), dtype=np.float32), side='right')
+                path = money[:, None] + np.cumsum(self._net_values[np.minimum(indices, len(self._net_values) - 1)],
+                                                  axis=1)
+                running_peak = np.maximum(np.maximum.accumulate(path, axis=1), peak[:, None])
+                drawdown = np.maximum(drawdown, (running_peak - path).max(axis=1))
+                lowest = np.minimum(lowest, path.min(axis=1))
+                peak = running_peak[:, -1]
+                money = path[:, -1]
+            ruined += int((lowest <= 0).sum())
+            drawdowns[first_path:first_path + count] = drawdown
+            finals[first_path:first_path + count] = money
+        return {
+            'Risk of Ruin': ruined / paths,
+            'Drawdown Quantiles': dict(zip(DRAWDOWN_QUANTILES, np.quantile(drawdowns, DRAWDOWN_QUANTILES))),
+            'Final Bankroll Quantiles': dict(zip(DRAWDOWN_QUANTILES, np.quantile(finals, DRAWDOWN_QUANTILES))),
+        }
+
+
+def print_risk(analysis, bankroll, rounds, result, min_frequency=0.005):
+    others = 0.0
+    for true_count, (frequency, units, bet) in analysis.table().items():
+        if frequency < min_frequency:
+            others += frequency
+            continue
+        print(f"TC {true_count:+d}: {frequency * 100:6.2f}% of rounds, EV {units * 100:+.2f}% per unit, bet {bet:g}")
+    if others:
+        print(f"Other true counts: {others * 100:.2f}% of rounds")
+    print(f"EV per round: {analysis.mean:.4f} (SD {analysis.sd:.4f}, average bet {analysis.average_bet:.2f})")
+    print(f"N0: {analysis.n0:,.0f} rounds, SCORE: {analysis.score:.2f}")
+    print(f"Risk of ruin over {rounds} rounds with {bankroll:g}: {result['Risk of Ruin'] * 100:.3f}% "
+          f"(infinite horizon approximation {analysis.analytic_risk_of_ruin(bankroll) * 100:.3f}%)")
+    print("Max drawdown quantiles: " + ", ".join(f"{quantile:.0%} {value:,.0f}"
+                                                 for quantile, value in result['Drawdown Quantiles'].items()))
+    print("Final bankroll quantiles: " + ", ".join(f"{quantile:.0%} {value:,.0f}"
+                                                  for quantile, value in result['Final Bankroll Quantiles'].items()))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (9, 10):
+        print("Usage: python risk_analysis.py card_count_values.csv betting_system.csv strategy_Ace.csv "
+              "strategy_Pair.csv strategy_Hard.csv num_games bankroll rounds [paths]")
+        sys.exit(1)
+
+    simulator = BlackjackSimulator(*sys.argv[1:6])
+    stats = simulator.run_parallel(int(sys.argv[6]))[0]
+    analysis = RiskAnalysis(stats, BettingSystem(sys.argv[2]))
+    bankroll, rounds = float(sys.argv[7]), int(sys.argv[8])
+    result = analysis.simulate(bankroll, rounds, paths=int(sys.argv[9]) if len(sys.argv) == 10 else 1000000, seed=0)
+    print_risk(analysis, bankroll, rounds, result)
@@ -0,0 +1,89 @@
+import os
+import sys
+
+from blackjack_simulatorV7 import ACTIONS, CARD_VALUES, DEALER_COLUMNS, StrategyManager
+from ev_analysis import ApproximateEVCalculator
+
+CANDIDATE_ACTIONS = {
+    'Pair': ('H', 'S', 'D', 'P', 'SrH', 'SrS'),
+    'Ace': ('H', 'S', 'D', 'SrH', 'SrS'),
+    'Hard': ('H', 'S', 'D', 'SrH', 'SrS'),
+}
+
+
+class StrategyOptimizer:
+    """ Essaie chaque action possible case par case et garde celles qui améliorent l'espérance calculée
+
+    Une case ne concerne qu'un rang visible du croupier : seules les mains de ce rang qui lisent la case sont
+    recalculées, le reste vient du cache de ApproximateEVCalculator. """
+
+    def __init__(self, strategy_manager, calculator):
+        self.strategy_manager = strategy_manager
+        self.calculator = calculator
+        self.evaluations = 0
+
+    def cells(self):
+        """ (table, clé CSV, rang du croupier, cases compilées) pour chaque case utilisée par la stratégie """
+        for (table_name, key), slots in self.strategy_manager.cell_slots.items():
+            columns = self.strategy_manager.table(table_name).columns
+            for dealer_rank, column in enumerate(DEALER_COLUMNS):
+                if column in columns:
+                    yield table_name, key, dealer_rank, slots
+
+    def try_action(self, table_name, key, dealer_rank, slots, action):
+        """ Applique action et renvoie (espérance, état pour annuler avec undo) """
+        previous = ACTIONS[self.strategy_manager.table_rows[table_name][key][dealer_rank]]
+        self.strategy_manager.set_action(table_name, key, dealer_rank, action)
+        invalidated = self.calculator.invalidate(slots, dealer_rank)
+        self.evaluations += 1
+        return self.calculator.expected_value(), (table_name, key, dealer_rank, previous, invalidated)
+
+    def undo(self, state):
+        table_name, key, dealer_rank, previous, invalidated = state
+        self.strategy_manager.set_action(table_name, key, dealer_rank, previous)
+        self.calculator.restore(invalidated, dealer_rank)
+
+    def optimize(self, max_passes=5, tolerance=1e-12, log=print):
+        """ Passes successives sur toutes les cases jusqu'à ce qu'aucune modification n'améliore l'espérance """
+        best_ev = self.calculator.expected_value()
+        changes = []
+        for pass_index in range(max_passes):
+            improved = False
+            for table_name, key, dealer_rank, slots in list(self.cells()):
+                for action in CANDIDATE_ACTIONS[table_name]:
+                    current = ACTIONS[self.strategy_manager.table_rows[table_name][key][dealer_rank]]
+                    if action == current:
+                        continue
+                    ev, state = self.try_action(table_name, key, dealer_rank, slots, action)
+                    if ev > best_ev + tolerance:
+                        changes.append((table_name, key, DEALER_COLUMNS[dealer_rank], current, action, ev - best_ev))
+                        if log:
+                            log(f"{table_name} {key} vs {CARD_VALUES[dealer_rank]}: {current} -> {action} "
+                                f"({(ev - best_ev) * 100:+.4f}%)")
+                        best_ev = ev
+                        improved = True
+                    else:
+                        self.undo(state)
+            if not improved:
+                break
+        return best_ev, changes
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (5, 6):
+        print("Usage: python strategy_optimizer.py strategy_Ace.csv strategy_Pair.csv strategy_Hard.csv output_dir "
+              "[num_decks]")
+        sys.exit(1)
+
+    strategy_manager = StrategyManager(sys.argv[2], sys.argv[1], sys.argv[3])
+    calculator = ApproximateEVCalculator(strategy_manager, num_decks=int(sys.argv[5]) if len(sys.argv) == 6 else 6)
+    optimizer = StrategyOptimizer(strategy_manager, calculator)
+    start_ev = calculator.expected_value()
+    best_ev, changes = optimizer.optimize()
+
+    output_dir = sys.argv[4]
+    os.makedirs(output_dir, exist_ok=True)
+    strategy_manager.save(os.path.join(output_dir, 'strategy_Pair.csv'), os.path.join(output_dir, 'strategy_Ace.csv'),
+                          os.path.join(output_dir, 'strategy_Hard.csv'))
+    print(f"Expected value: {start_ev * 100:+.3f}% -> {best_ev * 100:+.3f}% "
+          f"({len(changes)} changes, {optimizer.evaluations} evaluations)")
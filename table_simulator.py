@@ -0,0 +1,269 @@
+import os
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from blackjack_simulatorV7 import (DOUBLE, HIT, SPLIT, STAND, SURRENDER_HIT, SURRENDER_STAND, BettingSystem,
+                                   CardCounter, CounterGroup, Dealer, Deck, Player, SimulationStats, StrategyManager,
+                                   derive_seed, load_rules, make_shuffle_model, print_summary)
+
+
+class Seat:
+    """ Une place de la table : joueur, stratégie, mises, comptage suivi et statistiques propres
+
+    Stratégies, mises et compteurs sont partagés entre les places qui chargent les mêmes fichiers. """
+    __slots__ = ('player', 'strategy_manager', 'betting_system', 'card_counter', 'stats', 'start_money',
+                 'true_count', 'bet')
+
+    def __init__(self, player, strategy_manager, betting_system, card_counter, stats):
+        self.player = player
+        self.strategy_manager = strategy_manager
+        self.betting_system = betting_system
+        self.card_counter = card_counter
+        self.stats = stats
+        self.start_money = 0
+        self.true_count = 0
+        self.bet = 0
+
+
+class TableSimulator:
+    """ Table de plusieurs places qui tirent dans un même sabot, dans l'ordre des places
+
+    Chaque place est un dict de configuration : betting_file, ace_strategy_file, pair_strategy_file,
+    hard_strategy_file et, en option, deviation_file, count_values_file (celui de la table par défaut) et
+    initial_money. Les règles sont celles de BlackjackSimulator : une carte à chaque place puis au croupier, deux
+    fois ; chaque place joue ses mains, le croupier joue une seule fois (sauf si toutes les places ont un
+    blackjack), puis toutes les mains sont réglées en un passage. rules s'applique à toute la table (voir
+    HouseRules). Avec une seule place, la même graine et les mêmes règles, le résultat est celui de
+    BlackjackSimulator. """
+
+    def __init__(self, count_values_file, seats, num_decks=6, penetration=0.6, num_rounds=100, seed=None,
+                 shuffle='full', rules='Default'):
+        self.config = {'count_values_file': count_values_file, 'seats': [dict(seat) for seat in seats],
+                       'num_decks': num_decks, 'penetration': penetration, 'shuffle': shuffle, 'rules': rules}
+        if not seats:
+            raise ValueError("A table needs at least one seat")
+        self.num_decks = num_decks
+        self.penetration = penetration
+        self.num_rounds = num_rounds
+        self.seed = seed
+        self.rng = random.Random(seed) if seed is not None else random
+        self.shuffle_model = make_shuffle_model(shuffle, self.rng, seed)
+        self.deck = Deck(num_decks, shuffle_model=self.shuffle_model)
+        self.rules = load_rules(rules)
+        self.dealer = Dealer(self.rules.hit_soft_17)
+
+        counters, strategies, bettings = {}, {}, {}
+        self.seats = []
+        for config in seats:
+            count_file = config.get('count_values_file', count_values_file)
+            if count_file not in counters:
+                counters[count_file] = CardCounter(count_file)
+            strategy_files = (config['pair_strategy_file'], config['ace_strategy_file'],
+                              config['hard_strategy_file'], config.get('deviation_file'))
+            if strategy_files not in strategies:
+                strategies[strategy_files] = StrategyManager(*strategy_files)
+            if config['betting_file'] not in bettings:
+                bettings[config['betting_file']] = BettingSystem(config['betting_file'])
+            initial_money = config.get('initial_money', 0)
+            self.seats.append(Seat(Player(initial_money), strategies[strategy_files],
+                                   bettings[config['betting_file']], counters[count_file],
+                                   SimulationStats(initial_money)))
+        self.card_counters = list(counters.values())
+        self.counters = CounterGroup(self.card_counters) if len(self.card_counters) > 1 else self.card_counters[0]
+
+    def run(self):
+        for _ in range(self.num_rounds):
+            self.play_round()
+            if self.shuffle_model.continuous:
+                self.deck.return_cards()
+                self.counters.reset()
+            elif self.deck.remaining < self.num_decks * 52 * self.penetration:
+                self.deck.shuffle()
+                self.counters.reset()
+
+    def play_round(self):
+        seats = self.seats
+        deck, counters, dealer = self.deck, self.counters, self.dealer
+        dealer.reset_hands()
+        for seat in seats:
+            player = seat.player
+            player.reset_hands()
+            seat.start_money = player.money
+            seat.true_count = seat.card_counter.true_count
+            seat.bet = seat.betting_system.get_bet(seat.true_count)
+            player.place_bet(seat.bet)
+
+        for _ in range(2):
+            for seat in seats:
+                seat.player.receive_card(deck.draw_card(counters))
+            dealer.receive_card(deck.draw_card(counters))
+        if deck.remaining < self.num_decks * 52 * (1 - self.penetration):
+            deck.shuffle()  # Même sabot, remélangé sur place
+            counters.reset()
+
+        upcard = dealer.hands[0][0]
+        if self.rules.peek and dealer.has_blackjack():
+            self._settle_dealer_blackjack(upcard)
+        else:
+            playing = []
+            for seat in seats:
+                player = seat.player
+                if player.has_blackjack():
+                    if self.rules.enhc and dealer.has_blackjack():
+                        result = 'Push'
+                        player.money += player.bets[0]
+                    else:
+                        result = 'Player'
+                        player.money += player.bets[0] + player.bets[0] * self.rules.blackjack_payout
+                    seat.stats.record_hand(result, player.money)
+                else:
+                    self._play_hand(seat, 0, upcard)
+                    playing.append(seat)
+
+            if playing:
+                while dealer.should_hit():
+                    dealer.receive_card(deck.draw_card(counters))
+                self._settle(playing, dealer.hand_value(), self.rules.enhc and dealer.has_blackjack())
+
+        for seat in seats:
+            seat.stats.record_round(seat.player.money - seat.start_money, seat.true_count, seat.bet)
+
+    def _play_hand(self, seat, hand_index, upcard):
+        """ Même déroulé que BlackjackSimulator.player_turn, avec les codes d'action """
+        player, strategy_manager = seat.player, seat.strategy_manager
+        card_counter = seat.card_counter if strategy_manager.deviations else None
+        hand = player.hands[hand_index]
+        rules = self.rules
+        surrender_allowed = rules.surrender is not None
+        double_allowed = rules.double_after_split or len(player.hands) == 1
+        while True:
+            true_count = card_counter.true_count if card_counter is not None else None
+            action = strategy_manager.get_action_code(hand, upcard, true_count)
+            if action == SPLIT and not rules.can_split(player.hands, hand):
+                action = strategy_manager.lookup(-1, hand.aces > 0, hand.other_sum, upcard.rank, true_count)
+            if action == SURRENDER_HIT and not surrender_allowed:
+                action = HIT
+            elif action == SURRENDER_STAND and not surrender_allowed:
+                action = STAND
+            elif action == DOUBLE and not double_allowed:
+                action = HIT
+
+            if action == HIT:
+                hand.append(self.deck.draw_card(self.counters))
+                surrender_allowed = double_allowed = False
+            elif action == STAND:
+                return
+            elif action == DOUBLE:
+                player.double_bet(hand_index)
+                hand.append(self.deck.draw_card(self.counters))
+                return
+            elif action == SPLIT:
+                seat.stats.record_hand('Split', player.money)
+                player.split_hand(hand_index)
+                for new_hand_index in (hand_index, len(player.hands) - 1):
+                    player.receive_card(self.deck.draw_card(self.counters), new_hand_index)
+                    self._play_hand(seat, new_hand_index, upcard)
+                return
+            else:
+                if not rules.surrender_lost(self.dealer):
+                    player.money += player.bets[hand_index] // 2
+                player.bets[hand_index] = 0
+                return
+
+            if hand.value > 21:
+                return
+
+    def _settle_dealer_blackjack(self, upcard):
+        """ Peek : le croupier a un blackjack, la partie s'arrête avant toute décision """
+        early_surrender = self.rules.surrender == 'early'
+        for seat in self.seats:
+            player = seat.player
+            if player.has_blackjack():
+                result = 'Push'
+                player.money += player.bets[0]
+            elif early_surrender and seat.strategy_manager.get_action_code(
+                    player.hands[0], upcard,
+                    seat.card_counter.true_count if seat.strategy_manager.deviations else None) in (
+                    SURRENDER_HIT, SURRENDER_STAND):
+                result = 'Surrender'
+                player.money += player.bets[0] // 2
+                player.bets[0] = 0
+            else:
+                result = 'Dealer'
+            seat.stats.record_hand(result, player.money)
+
+    def _settle(self, seats, dealer_value, dealer_blackjack=False):
+        """ Règle toutes les mains des places contre la main du croupier, jouée une seule fois
+
+        dealer_blackjack : blackjack du croupier sous ENHC, qui bat toutes les mains restantes """
+        surrender_lost = self.rules.surrender_lost(self.dealer)
+        for seat in seats:
+            player, stats = seat.player, seat.stats
+            for hand, bet in zip(player.hands, player.bets):
+                if bet == 0:
+                    result = 'Dealer' if surrender_lost else 'Surrender'
+                else:
+                    player_value = hand.value
+                    if player_value > 21 or dealer_blackjack:
+                        result = 'Dealer'
+                    elif dealer_value > 21 or player_value > dealer_value:
+                        result = 'Player'
+                        player.money += bet * 2
+                    elif player_value < dealer_value:
+                        result = 'Dealer'
+                    else:
+                        result = 'Push'
+                        player.money += bet
+                stats.record_hand(result, player.money)
+
+    def run_parallel(self, num_rounds, workers=None, seed=0):
+        """ Répartit num_rounds entre plusieurs processus (graines dérivées de seed) ; renvoie les statistiques
+        fusionnées de chaque place (modèles de mélange nommés uniquement, comme BlackjackSimulator.run_parallel) """
+        if not isinstance(self.config['shuffle'], str):
+            raise ValueError("Parallel runs need a named shuffle model ('full', 'continuous' or 'replay')")
+        workers = workers or os.cpu_count()
+        jobs = [(self.config, num_rounds // workers + (index < num_rounds % workers), derive_seed(seed, index))
+                for index in range(workers)]
+        jobs = [job for job in jobs if job[1]]
+        if len(jobs) <= 1:
+            outcomes = [_table_worker(job) for job in jobs]
+        else:
+            with ProcessPoolExecutor(max_workers=len(jobs)) as executor:
+                outcomes = list(executor.map(_table_worker, jobs))
+
+        seat_stats = [SimulationStats(seat.stats.initial_money) for seat in self.seats]
+        for worker_stats in outcomes:
+            for stats, other in zip(seat_stats, worker_stats):
+                stats.merge(other)
+        return seat_stats
+
+
+def _table_worker(job):
+    config, num_rounds, seed = job
+    # Chaque worker part de initial_money ; merge décale ensuite ses montants
+    simulator = TableSimulator(config['count_values_file'], config['seats'], config['num_decks'],
+                               config['penetration'], num_rounds, seed, config['shuffle'], config['rules'])
+    simulator.run()
+    return [seat.stats for seat in simulator.seats]
+
+
+def _seat_config(argument):
+    betting_file, strategy_dir = argument.split(',')
+    return {'betting_file': betting_file,
+            'ace_strategy_file': os.path.join(strategy_dir, 'strategy_Ace.csv'),
+            'pair_strategy_file': os.path.join(strategy_dir, 'strategy_Pair.csv'),
+            'hard_strategy_file': os.path.join(strategy_dir, 'strategy_Hard.csv')}
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 4:
+        print("Usage: python table_simulator.py card_count_values.csv num_rounds seat [seat ...]\n"
+              "  a seat is betting_file,strategy_dir, e.g. betting_system.csv,. "
+              "\"betting_system.csv,Strategy/Basic Strategy ENHC\"")
+        sys.exit(1)
+
+    table = TableSimulator(sys.argv[1], [_seat_config(argument) for argument in sys.argv[3:]])
+    for index, stats in enumerate(table.run_parallel(int(sys.argv[2]))):
+        print(f"Seat {index + 1}: {sys.argv[3 + index]}")
+        print_summary(stats.summary())